@@ -1,6 +1,8 @@
 from pathlib import Path
 from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 import os
+import sys
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -55,6 +57,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -68,6 +72,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'DevConnector_back.urls'
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.JWTAuthentication',
+    ],
+    'EXCEPTION_HANDLER': 'api.exceptions.exception_handler',
+}
+
+# Verified x-auth-token -> user cache (api/authentication.py)
+JWT_AUTH_CACHE_SIZE = int(os.getenv("JWT_AUTH_CACHE_SIZE", "10000"))
+JWT_AUTH_CACHE_TTL = int(os.getenv("JWT_AUTH_CACHE_TTL", "300"))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -89,10 +108,17 @@ WSGI_APPLICATION = 'DevConnector_back.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL in deployment. Only DEBUG and test runs may fall back to a
+# local SQLite file; a deploy missing the variable should fail, not start
+# on an empty database.
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    if not (DEBUG or sys.argv[1:2] == ['test']):
+        raise ImproperlyConfigured("DATABASE_URL is not set (only DEBUG and test runs default to SQLite).")
+    DATABASE_URL = f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.getenv("DATABASE_URL")
-    )
+    'default': dj_database_url.config(default=DATABASE_URL)
     # 'default': {
     #     'ENGINE': 'django.db.backends.postgresql',
     #     'NAME': 'devconnectordb',
@@ -122,6 +148,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing runs in a bounded pool (api/passwords.py). Changing the
+# iteration count rehashes each stored password on its next login.
+PASSWORD_HASHERS = [
+    'api.passwords.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "0")) or None
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -154,7 +193,7 @@ CSRF_TRUSTED_ORIGINS = [
 # CORS
 CORS_ALLOWED_ORIGINS = [
     "https://wortex-devconnector.netlify.app",
-    "http://localhost:5173/"
+    "http://localhost:5173"
 ]
 
 CORS_ALLOW_METHODS = [
@@ -171,16 +210,81 @@ CORS_ALLOW_CREDENTIALS = True
 
 ASGI_APPLICATION = "DevConnector_back.asgi.application"
 
+# Serve the read endpoints from api/async_views.py (only useful under ASGI)
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "").lower() in ("1", "true")
+
+# /openai/ proxy (api/assistant.py). ASSISTANT_BACKEND can point at
+# api.assistant.FakeBackend, or ASSISTANT_BASE_URL at a local compatible server.
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+ASSISTANT_BACKEND = os.getenv("ASSISTANT_BACKEND", "api.assistant.OpenAIBackend")
+ASSISTANT_BASE_URL = os.getenv("ASSISTANT_BASE_URL") or None
+ASSISTANT_MODEL = os.getenv("ASSISTANT_MODEL", "gpt-4o-mini")
+ASSISTANT_TIMEOUT = float(os.getenv("ASSISTANT_TIMEOUT", "30"))
+ASSISTANT_MAX_CONCURRENCY = int(os.getenv("ASSISTANT_MAX_CONCURRENCY", "8"))
+ASSISTANT_CACHE_TTL = int(os.getenv("ASSISTANT_CACHE_TTL", "3600"))
+
+
+# for development (and tests): InMemoryChannelLayer when no Redis is configured
+if os.getenv("REDIS_URL"):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.getenv("REDIS_URL")],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
 
-# for development: InMemoryChannelLayer !!!
-CHANNEL_LAYERS = {
-    "default": {
-        # "BACKEND": "channels.layers.InMemoryChannelLayer" 
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [os.getenv("REDIS_URL")],
-        },
+# Response cache for the posts feed / post detail (api/cache.py).
+# Falls back to process-local memory when no Redis is configured.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Prometheus metrics at /metrics, plus /cache/stats and /ratelimit/stats
+# (api/metrics.py); when set, callers must send
+# "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# Request profiling (api/profiling.py): cProfile 1 in PROFILE_SAMPLE_RATE
+# requests (0 = off) plus any request sending "X-Profile: <PROFILE_TOKEN>".
+# Results are served at /profiling to callers sending "X-Profile-Token".
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "20"))
+
+# Token-bucket limits (api/ratelimit.py): "<requests>/<period>" per user, or
+# per IP for anonymous callers. "ws:<action>" limits ChatConsumer actions and
+# "ws" covers any action without its own entry.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis" if os.getenv("REDIS_URL") else "local")
+# Proxies in front of the app that append to X-Forwarded-For. Render (which
+# sets RENDER) has one; without it every anonymous caller would share the
+# proxy's address and so one bucket.
+RATE_LIMIT_PROXY_COUNT = int(os.getenv("RATE_LIMIT_PROXY_COUNT", "1" if os.getenv("RENDER") else "0"))
+RATE_LIMITS = {
+    "login": "10/min",
+    "register": "5/min",
+    "openai": "20/min",
+    "ws": "30/10s",
+    "ws:new_chat": "10/min",
+    "ws:send_message": "20/10s",
 }
 
 STATIC_URL = '/static/'
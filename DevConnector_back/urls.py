@@ -1,26 +1,40 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from api import views
+from api import async_views, metrics, profiling, views
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('register/', views.register, name='register'),
-    path('login/', views.login, name='login'),
-    path('create-profile/', views.create_profile, name='create_profile'),
-    path('profile', views.list_profiles, name='list_profiles'),
-    path('profile/user/<uuid:id>', views.get_profile_by_user, name='get_profile_by_user'),
-    path('search/', views.search_profile_by_username, name='search_profile_by_username'),
-    path('profile/me', views.get_profile_me, name='get_profile_me'),
-    path('profile/<uuid:id>', views.delete_profile, name='delete_profile'),
-    path('profile/experience/<uuid:id>', views.delete_experience, name='delete_experience'),
-    path('profile/education/<uuid:id>', views.delete_education, name='delete_education'),
-    path('profile/experience', views.add_experience, name='add_experience'),
-    path('profile/education', views.add_education, name='add_education'),
-    path('posts', views.posts, name='posts'),
-    path('posts/<uuid:id>', views.post_detail, name='post_detail'),
-    path('posts/like/<uuid:id>', views.like_post, name='like_post'),
-    path('posts/unlike/<uuid:id>', views.unlike_post, name='unlike_post'),
-    path('posts/comment/<uuid:id>', views.add_comment, name='add_comment'),
-    path('posts/comment/<uuid:post_id>/<uuid:comment_id>', views.delete_comment, name='delete_comment'),
-    path('openai/', views.openai, name='openai'),
-]
+
+def routes(reads):
+    """The URL patterns, with ``reads`` (api.views or api.async_views) serving the read-heavy endpoints."""
+    return [
+        path('admin/', admin.site.urls),
+        path('register/', views.register, name='register'),
+        path('login/', views.login, name='login'),
+        path('create-profile/', views.create_profile, name='create_profile'),
+        path('profile', reads.list_profiles, name='list_profiles'),
+        path('profile/batch', views.batch_profiles, name='batch_profiles'),
+        path('profile/user/<uuid:id>', reads.get_profile_by_user, name='get_profile_by_user'),
+        path('search/', reads.search_profile_by_username, name='search_profile_by_username'),
+        path('profile/me', views.get_profile_me, name='get_profile_me'),
+        path('profile/<uuid:id>', views.delete_profile, name='delete_profile'),
+        path('profile/deletion/<uuid:job_id>', views.account_deletion_status, name='account_deletion_status'),
+        path('profile/experience/<uuid:id>', views.delete_experience, name='delete_experience'),
+        path('profile/education/<uuid:id>', views.delete_education, name='delete_education'),
+        path('profile/experience', views.add_experience, name='add_experience'),
+        path('profile/education', views.add_education, name='add_education'),
+        path('posts', reads.posts, name='posts'),
+        path('posts/<uuid:id>', reads.post_detail, name='post_detail'),
+        path('posts/like/<uuid:id>', views.like_post, name='like_post'),
+        path('posts/unlike/<uuid:id>', views.unlike_post, name='unlike_post'),
+        path('posts/comment/<uuid:id>', views.add_comment, name='add_comment'),
+        path('posts/comment/<uuid:post_id>/<uuid:comment_id>', views.delete_comment, name='delete_comment'),
+        path('openai/', async_views.openai, name='openai'),
+        path('cache/stats', views.cache_stats, name='cache_stats'),
+        path('ratelimit/stats', views.rate_limit_stats, name='rate_limit_stats'),
+        path('metrics', metrics.metrics_view, name='metrics'),
+        path('profiling', profiling.profiles_view, name='profiling'),
+    ]
+
+
+# Read-heavy endpoints run as native async views under ASGI when enabled
+urlpatterns = routes(async_views if settings.ASYNC_READ_VIEWS else views)
@@ -0,0 +1,101 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from . import cache as posts_cache
+from .models import AccountDeletionJob, Comment, Post, Profile, User
+
+
+logger = logging.getLogger(__name__)
+
+DELETION_JOB_TIMEOUT = 24 * 60 * 60
+
+# Deletions are rare; two workers keep a burst from tying up the database
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="account-deletion")
+
+
+def _release_post_counters(user_id):
+    """Decrement counters on others' posts the user liked or commented on; return their ids."""
+    likes = Post.likes.through.objects.filter(user_id=user_id)
+    liked = Post.objects.filter(id__in=likes.values('post_id')).exclude(user_id=user_id)
+    commented = Post.objects.filter(
+        id__in=Comment.objects.filter(user_id=user_id).values('post_id')
+    ).exclude(user_id=user_id)
+    touched = set(liked.values_list('id', flat=True)) | set(commented.values_list('id', flat=True))
+
+    liked.update(likes_count=F('likes_count') - 1, updated_at=timezone.now())
+
+    user_comments = (
+        Comment.objects.filter(post_id=OuterRef('pk'), user_id=user_id)
+        .values('post_id').annotate(n=Count('*')).values('n')
+    )
+    commented.update(comments_count=F('comments_count') - Subquery(user_comments), updated_at=timezone.now())
+    return touched
+
+
+def delete_account(user_id):
+    """
+    Delete a user and everything hanging off it in one transaction, one
+    set-based statement per table. Returns ``False`` if the user does not exist.
+    """
+    with transaction.atomic():
+        if not User.objects.select_for_update().filter(id=user_id).exists():
+            return False
+
+        touched = _release_post_counters(user_id)
+        touched.update(Post.objects.filter(user_id=user_id).values_list('id', flat=True))
+
+        # The large child tables go first in one statement each, so the parent
+        # deletes below only find the user's own few rows left to cascade
+        Post.likes.through.objects.filter(Q(user_id=user_id) | Q(post__user_id=user_id)).delete()
+        Comment.objects.filter(Q(user_id=user_id) | Q(post__user_id=user_id)).delete()
+        Post.objects.filter(user_id=user_id).delete()
+        Profile.objects.filter(user_id=user_id).delete()
+        User.objects.filter(id=user_id).delete()
+
+        posts_cache.invalidate_posts(touched)
+    return True
+
+
+def get_deletion_job(job_id, requested_by):
+    """The job's state, or ``None`` if it does not exist or was queued by someone else."""
+    job = AccountDeletionJob.objects.filter(id=job_id, requested_by=requested_by).values('status', 'user_id').first()
+    if job is not None:
+        job['user_id'] = str(job['user_id'])
+    return job
+
+
+def _set_status(job_id, status):
+    AccountDeletionJob.objects.filter(id=job_id).update(status=status, updated_at=timezone.now())
+
+
+def _run_deletion_job(job_id, user_id):
+    try:
+        _set_status(job_id, "running")
+        try:
+            deleted = delete_account(user_id)
+        except Exception:
+            logger.exception("Account deletion %s failed", job_id)
+            _set_status(job_id, "failed")
+        else:
+            _set_status(job_id, "done" if deleted else "not_found")
+    finally:
+        close_old_connections()
+
+
+def queue_account_deletion(user_id, requested_by):
+    """
+    Run ``delete_account`` on a background thread and return the id of the
+    ``AccountDeletionJob`` tracking it. Jobs older than a day are pruned here.
+    """
+    AccountDeletionJob.objects.filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=DELETION_JOB_TIMEOUT)
+    ).delete()
+    job = AccountDeletionJob.objects.create(user_id=user_id, requested_by=requested_by)
+    # The thread's own connection only sees the row once it is committed
+    transaction.on_commit(lambda: _executor.submit(_run_deletion_job, job.id, user_id))
+    return job.id
@@ -0,0 +1,218 @@
+"""
+Chat completions behind ``/openai/``.
+
+The backend is chosen with ``ASSISTANT_BACKEND`` (a dotted path), so tests
+and benchmarks can swap in ``FakeBackend`` or point ``OpenAIBackend`` at a
+local OpenAI-compatible server via ``ASSISTANT_BASE_URL``. Calls are capped
+at ``ASSISTANT_MAX_CONCURRENCY`` in flight per process, bounded by
+``ASSISTANT_TIMEOUT`` and answers are cached for ``ASSISTANT_CACHE_TTL``
+seconds keyed by a hash of the model and prompt.
+"""
+import asyncio
+import hashlib
+import threading
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+class AssistantBusy(Exception):
+    """``ASSISTANT_MAX_CONCURRENCY`` completions are already in flight."""
+
+
+class AssistantError(Exception):
+    """The backend failed (502) or timed out (504)."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def build_messages(message):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": message},
+    ]
+
+
+class OpenAIBackend:
+    def __init__(self):
+        # AsyncOpenAI wraps an httpx pool bound to the loop it first ran on;
+        # keep one client per loop so WSGI (a loop per call) also works
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def model(self):
+        return _setting('ASSISTANT_MODEL', "gpt-4o-mini")
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(
+                api_key=_setting('OPENAI_API_KEY', None),
+                base_url=_setting('ASSISTANT_BASE_URL', None),
+                timeout=_setting('ASSISTANT_TIMEOUT', 30),
+                max_retries=1,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def complete(self, messages):
+        response = await self._client().chat.completions.create(model=self.model, messages=messages)
+        return response.choices[0].message.content
+
+    async def stream(self, messages):
+        response = await self._client().chat.completions.create(model=self.model, messages=messages, stream=True)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeBackend:
+    """Echoes the prompt word by word, waiting ``ASSISTANT_FAKE_DELAY`` seconds per word."""
+
+    model = "fake"
+
+    def _words(self, messages):
+        words = f"You said: {messages[-1]['content']}".split(' ')
+        return [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+
+    async def complete(self, messages):
+        parts = []
+        async for part in self.stream(messages):
+            parts.append(part)
+        return ''.join(parts)
+
+    async def stream(self, messages):
+        delay = _setting('ASSISTANT_FAKE_DELAY', 0.01)
+        for word in self._words(messages):
+            await asyncio.sleep(delay)
+            yield word
+
+
+_backends = {}
+
+
+def get_backend():
+    path = _setting('ASSISTANT_BACKEND', 'api.assistant.OpenAIBackend')
+    backend = _backends.get(path)
+    if backend is None:
+        backend = _backends.setdefault(path, import_string(path)())
+    return backend
+
+
+class _Slots:
+    # A plain counter rather than asyncio.Semaphore: the limit has to hold
+    # across event loops and threads, and callers fail fast instead of queueing
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def acquire(self):
+        with self._lock:
+            if self.in_use >= _setting('ASSISTANT_MAX_CONCURRENCY', 8):
+                raise AssistantBusy()
+            self.in_use += 1
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+
+
+slots = _Slots()
+
+
+def cache_key(model, message):
+    digest = hashlib.sha256(f"{model}\0{message}".encode()).hexdigest()
+    return f"assistant:{digest}"
+
+
+async def complete(message):
+    """The answer to ``message``, from the cache when the same prompt was asked recently."""
+    backend = get_backend()
+    key = cache_key(backend.model, message)
+    answer = await cache.aget(key)
+    if answer is not None:
+        return answer
+
+    slots.acquire()
+    try:
+        answer = await asyncio.wait_for(
+            backend.complete(build_messages(message)), _setting('ASSISTANT_TIMEOUT', 30)
+        )
+    except TimeoutError:
+        raise AssistantError("Upstream timed out", status=504)
+    except Exception as e:
+        raise AssistantError(f"Upstream error: {e.__class__.__name__}")
+    finally:
+        slots.release()
+
+    await cache.aset(key, answer, _setting('ASSISTANT_CACHE_TTL', 3600))
+    return answer
+
+
+async def _once(answer):
+    yield answer
+
+
+async def _chain(first, rest):
+    yield first
+    async for part in rest:
+        yield part
+
+
+async def _stream_backend(backend, key, message):
+    slots.acquire()
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + _setting('ASSISTANT_TIMEOUT', 30)
+        parts = []
+        pieces = aiter(backend.stream(build_messages(message)))
+        while True:
+            try:
+                part = await asyncio.wait_for(anext(pieces), deadline - loop.time())
+            except StopAsyncIteration:
+                break
+            except TimeoutError:
+                raise AssistantError("Upstream timed out", status=504)
+            except Exception as e:
+                raise AssistantError(f"Upstream error: {e.__class__.__name__}")
+            parts.append(part)
+            yield part
+    finally:
+        slots.release()
+
+    await cache.aset(key, ''.join(parts), _setting('ASSISTANT_CACHE_TTL', 3600))
+
+
+async def stream(message):
+    """
+    An async iterator over the answer to ``message`` as the backend produces
+    it; a cached answer comes back as one piece. The first piece is awaited
+    here, so ``AssistantBusy`` and failures before any output are raised to
+    the caller rather than midway through a response.
+    """
+    backend = get_backend()
+    key = cache_key(backend.model, message)
+    answer = await cache.aget(key)
+    if answer is not None:
+        return _once(answer)
+
+    pieces = _stream_backend(backend, key, message)
+    try:
+        first = await anext(pieces)
+    except StopAsyncIteration:
+        return _once('')
+    return _chain(first, pieces)
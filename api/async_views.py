@@ -0,0 +1,175 @@
+"""
+Async versions of the read-heavy endpoints, served natively by the ASGI
+application instead of through a thread per request.
+
+They return the same payloads as their counterparts in ``api/views.py``
+and are routed in place of them when ``ASYNC_READ_VIEWS`` is on. Writes on
+the shared routes (``POST /posts``, ``DELETE /posts/<id>``) are handed to
+the sync DRF views, which keep authentication and permissions.
+
+``openai`` lives here too and is always routed: it mostly waits on the
+upstream model, which should not hold a worker thread.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import assistant
+from . import cache as posts_cache
+from . import etags
+from . import renderers
+from . import search
+from . import serializers
+from . import views
+from .models import Post, Profile
+from .pagination import InvalidCursor, akeyset_page, parse_limit
+from .ratelimit import rate_limit
+
+
+def _json(data, status=200, headers=None):
+    return HttpResponse(renderers.dumps(data), content_type='application/json', status=status, headers=headers)
+
+
+def _not_modified(etag):
+    return HttpResponse(status=304, headers={"ETag": etag})
+
+
+# Like the DRF views they replace, these are csrf_exempt: callers
+# authenticate with the x-auth-token header, not a session cookie
+
+@csrf_exempt
+async def posts(request):
+    if request.method != 'GET':
+        return await sync_to_async(views.posts)(request)
+
+    cursor = request.GET.get('cursor')
+    try:
+        limit = parse_limit(request.GET.get('limit'))
+        data = await posts_cache.afeed_page(cursor, limit, lambda: _build_feed_page(cursor, limit))
+    except InvalidCursor as e:
+        return _json({"error": str(e)}, status=400)
+    return _json(data)
+
+
+async def _build_feed_page(cursor, limit):
+    page, next_cursor = await akeyset_page(Post.objects.all(), cursor, limit)
+    return views._feed_document(page, next_cursor)
+
+
+@csrf_exempt
+async def post_detail(request, id):
+    if request.method != 'GET':
+        return await sync_to_async(views.post_detail)(request, id=id)
+
+    cached = await posts_cache.apost_document(id, lambda: _build_post_document(id))
+    if cached is None:
+        return _json({"error": "Post not found"}, status=404)
+    if etags.matches(request, cached["etag"]):
+        return _not_modified(cached["etag"])
+    return _json(cached["document"], headers={"ETag": cached["etag"]})
+
+
+async def _build_post_document(id):
+    try:
+        post = await Post.objects.aget(id=id)
+    except Post.DoesNotExist:
+        return None
+    like_ids = [pk async for pk in post.likes.values_list('id', flat=True)]
+    comments = [c async for c in post.comments.all().order_by('-date')]
+    return {"etag": etags.post_etag(post), "document": views._post_document(post, like_ids, comments)}
+
+
+async def _profile_summaries(rows):
+    skills = await serializers.askills_by_profile([p['id'] for p in rows])
+    return [serializers.profile_summary(p, skills[p['id']]) for p in rows]
+
+
+@csrf_exempt
+@require_GET
+async def list_profiles(request):
+    profiles = Profile.objects.values(*serializers.PROFILE_SUMMARY_FIELDS)
+    if request.GET.getlist('skill'):
+        # Resolving skill names is one small query; reuse the sync helper in a thread
+        profiles = await sync_to_async(views._filter_by_skills)(profiles, request.GET.getlist('skill'))
+
+    if 'limit' in request.GET or 'cursor' in request.GET:
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+            page, next_cursor = await akeyset_page(profiles, request.GET.get('cursor'), limit, field='created_at')
+        except InvalidCursor as e:
+            return _json({"error": str(e)}, status=400)
+        return _json({"results": await _profile_summaries(page), "next": next_cursor})
+
+    # The sync view's encoder, pulled a chunk at a time on one thread
+    rows = profiles.order_by('-created_at', '-id').iterator(chunk_size=views.PROFILE_STREAM_CHUNK)
+    return StreamingHttpResponse(views._iterate_in_thread(views._stream_profiles(rows)),
+                                 content_type='application/json', status=200)
+
+
+@csrf_exempt
+@require_GET
+async def get_profile_by_user(request, id):
+    etag = await etags.aprofile_etag(id)
+    if etag is None:
+        return _json({"error": "Profile not found"}, status=404)
+    if etags.matches(request, etag):
+        return _not_modified(etag)
+
+    data = await serializers.aload_profile_document(id)
+    if data is None:
+        return _json({"error": "Profile not found"}, status=404)
+    return _json(data, headers={"ETag": etag})
+
+
+@csrf_exempt
+@require_GET
+async def search_profile_by_username(request):
+    try:
+        limit = parse_limit(request.GET.get('limit'), default=search.DEFAULT_LIMIT, maximum=search.MAX_LIMIT)
+    except InvalidCursor as e:
+        return _json({"error": str(e)}, status=400)
+
+    return _json(await search.asearch_users(request.GET.get('q', ''), limit))
+
+
+async def _sse(pieces):
+    try:
+        async for piece in pieces:
+            yield b'data: ' + renderers.dumps({"delta": piece}) + b'\n\n'
+    except assistant.AssistantError as e:
+        yield b'event: error\ndata: ' + renderers.dumps({"error": str(e)}) + b'\n\n'
+        return
+    yield b'data: [DONE]\n\n'
+
+
+@csrf_exempt
+@require_POST
+@rate_limit('openai')
+async def openai(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return _json({"error": "Invalid JSON"}, status=400)
+    message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return _json({"error": "message is required"}, status=400)
+
+    # {"stream": true} or ?stream=1 answers with Server-Sent Events as tokens arrive
+    streaming = data.get("stream") is True or request.GET.get('stream') in ('1', 'true')
+    try:
+        if streaming:
+            pieces = await assistant.stream(message)
+            return StreamingHttpResponse(
+                _sse(pieces),
+                content_type='text/event-stream',
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        answer = await assistant.complete(message)
+    except assistant.AssistantBusy:
+        return _json({"error": "Assistant is busy, try again shortly"}, status=503, headers={"Retry-After": "1"})
+    except assistant.AssistantError as e:
+        return _json({"error": str(e)}, status=e.status)
+    return _json({"response": answer})
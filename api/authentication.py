@@ -0,0 +1,214 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import BaseAuthentication
+
+from .models import User
+
+
+JWT_SECRET = settings.SECRET_KEY
+JWT_ALGORITHM = 'HS256'
+
+# auth_error for a valid token whose user was deleted; answered with a 404
+USER_NOT_FOUND = "User not found"
+
+
+def create_token(user_id):
+    now = datetime.now(timezone.utc)
+    payload = {
+        'user_id': str(user_id),
+        'exp': now + timedelta(days=7),
+        'iat': now
+    }
+    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return token
+
+
+class _Entry:
+    __slots__ = ('user_id', 'expires', 'user', 'version')
+
+    def __init__(self, user_id, expires, user, version):
+        self.user_id = user_id
+        self.expires = expires
+        self.user = user
+        self.version = version
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token -> user row (``None`` once the user is
+    gone). Entries live for at most ``ttl`` seconds and never past the
+    token's own ``exp``. Saving or deleting a user drops its entries in this
+    process at once, and in every other one through the user's version in
+    the shared cache (see ``user_version``).
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                self._discard(token)
+                return None
+            self._entries.move_to_end(token)
+            return entry
+
+    def put(self, token, user_id, exp, user, version):
+        lifetime = min(self.ttl, exp - time.time()) if exp else self.ttl
+        entry = _Entry(user_id, time.monotonic() + lifetime, user, version)
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = entry
+            self._by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+        return entry
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._discard(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _discard(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._by_user.get(entry.user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[entry.user_id]
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, 'JWT_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_AUTH_CACHE_TTL', 300),
+)
+
+
+def _user_version_key(user_id):
+    return f"auth:user:{user_id}:version"
+
+
+def user_version(user_id):
+    """
+    The user's version in the shared cache, created if missing. Cached
+    tokens remember the version they were verified under and are checked
+    again once it changes. Like the post versions in api/cache.py it starts
+    from the clock, so an evicted key can only force a re-check.
+    """
+    key = _user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, token_cache.ttl):
+            version = cache.get(key, version)
+    return version
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _drop_cached_tokens(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.id)
+    # Other workers see the change once it is committed
+    key = _user_version_key(instance.id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class TokenUser:
+    """
+    ``request.user`` for token-authenticated requests, backed by the user
+    row loaded when the token was first verified.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, entry):
+        self._entry = entry
+
+    @property
+    def id(self):
+        return self._entry.user_id
+
+    pk = id
+
+    @property
+    def instance(self):
+        return self._entry.user
+
+    def __getattr__(self, name):
+        return getattr(self.instance, name)
+
+    def __str__(self):
+        return str(self.instance)
+
+
+class JWTAuthentication(BaseAuthentication):
+    """
+    Authenticates the ``x-auth-token`` header issued by ``create_token``.
+
+    A bad token, or one for a user that no longer exists, leaves the request
+    anonymous rather than failing it outright, so public endpoints keep
+    working for clients holding a stale token; the reason is kept on
+    ``request.auth_error`` for the permission classes.
+
+    A token is verified against the database once, when it is cached; after
+    that a request costs one shared-cache read to see if the user changed.
+    """
+
+    def authenticate(self, request):
+        token = request.headers.get('x-auth-token')
+        if not token:
+            return None
+
+        entry = token_cache.get(token)
+        # Deleted users never come back, so only live entries are re-checked
+        if entry is not None and entry.user is not None and cache.get(_user_version_key(entry.user_id)) != entry.version:
+            entry = None
+        if entry is None:
+            try:
+                decoded = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+                user_id = uuid.UUID(str(decoded['user_id']))
+            except jwt.ExpiredSignatureError:
+                request.auth_error = "Token expired"
+                return None
+            except (jwt.InvalidTokenError, KeyError, ValueError):
+                request.auth_error = "Invalid token"
+                return None
+            # Version first: a change committed after this read is seen next time
+            version = user_version(user_id)
+            user = User.objects.filter(id=user_id).first()
+            entry = token_cache.put(token, user_id, decoded.get('exp'), user, version)
+
+        if entry.user is None:
+            request.auth_error = USER_NOT_FOUND
+            # Still needed to poll the deletion of one's own account
+            request.deleted_user_id = entry.user_id
+            return None
+        return TokenUser(entry), token
+
+    def authenticate_header(self, request):
+        # Makes DRF answer 401 rather than 403 for missing/invalid tokens
+        return 'x-auth-token'
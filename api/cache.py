@@ -0,0 +1,131 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+FEED_VERSION_KEY = "posts:feed:version"
+FEED_TIMEOUT = 60
+POST_TIMEOUT = 300
+# Longer than any document stored under a version; expiring one early only
+# costs a rebuild, since the next version is taken from the clock again
+VERSION_TIMEOUT = 2 * POST_TIMEOUT
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {"hits": h, "misses": m} for name, (h, m) in self._counts.items()}
+
+
+stats = CacheStats()
+
+
+def _post_version_key(post_id):
+    return f"posts:detail:{post_id}:version"
+
+
+def _post_key(post_id, version):
+    return f"posts:detail:{post_id}:{version}"
+
+
+def _version(key):
+    # Versions start from the clock, so an evicted version key can never
+    # bring back documents stored under an older version.
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def _get_or_build(name, key, build, timeout):
+    data = cache.get(key)
+    if data is not None:
+        stats.record(name, hit=True)
+        return data
+    stats.record(name, hit=False)
+    data = build()
+    if data is not None:
+        cache.set(key, data, timeout)
+    return data
+
+
+def _feed_key(version, cursor, limit):
+    return f"posts:feed:{version}:{limit}:{cursor or ''}"
+
+
+def feed_page(cursor, limit, build):
+    key = _feed_key(_version(FEED_VERSION_KEY), cursor, limit)
+    return _get_or_build("feed", key, build, FEED_TIMEOUT)
+
+
+def post_document(post_id, build):
+    data = _get_or_build("post", _post_key(post_id, post_version(post_id)), build, POST_TIMEOUT)
+    if data is None:
+        # No such post: do not keep a version key for every id asked about
+        cache.delete(_post_version_key(post_id))
+    return data
+
+
+def post_version(post_id):
+    return _version(_post_version_key(post_id))
+
+
+# Async counterparts for api/async_views.py; ``build`` is a coroutine function
+
+async def _aversion(key):
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, VERSION_TIMEOUT):
+            version = await cache.aget(key, version)
+    return version
+
+
+async def _aget_or_build(name, key, build, timeout):
+    data = await cache.aget(key)
+    if data is not None:
+        stats.record(name, hit=True)
+        return data
+    stats.record(name, hit=False)
+    data = await build()
+    if data is not None:
+        await cache.aset(key, data, timeout)
+    return data
+
+
+async def afeed_page(cursor, limit, build):
+    key = _feed_key(await _aversion(FEED_VERSION_KEY), cursor, limit)
+    return await _aget_or_build("feed", key, build, FEED_TIMEOUT)
+
+
+async def apost_document(post_id, build):
+    data = await _aget_or_build("post", _post_key(post_id, await apost_version(post_id)), build, POST_TIMEOUT)
+    if data is None:
+        await cache.adelete(_post_version_key(post_id))
+    return data
+
+
+async def apost_version(post_id):
+    return await _aversion(_post_version_key(post_id))
+
+
+def invalidate_posts(post_ids=()):
+    """
+    Drop the feed version and the versions of ``post_ids`` once the
+    current transaction commits, so readers rebuild from committed rows.
+    """
+    keys = [FEED_VERSION_KEY] + [_post_version_key(pk) for pk in post_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
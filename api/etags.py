@@ -0,0 +1,71 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .models import Education, Experience, Profile
+
+
+def _child_stat(model, aggregate):
+    return Subquery(
+        model.objects.filter(profile_id=OuterRef('pk'))
+        .values('profile_id').annotate(v=aggregate).values('v')
+    )
+
+
+def _profile_stats(user_id):
+    return (
+        Profile.objects.filter(user_id=user_id)
+        .annotate(
+            exp_n=_child_stat(Experience, Count('*')),
+            exp_max=_child_stat(Experience, Max('created_at')),
+            edu_n=_child_stat(Education, Count('*')),
+            edu_max=_child_stat(Education, Max('created_at')),
+        )
+        .values_list('id', 'updated_at', 'exp_n', 'exp_max', 'edu_n', 'edu_max')
+    )
+
+
+def _profile_tag(row):
+    if row is None:
+        return None
+    digest = hashlib.sha1('|'.join(map(str, row)).encode()).hexdigest()
+    return f'"profile-{digest}"'
+
+
+def profile_etag(user_id):
+    """
+    Validator for a user's profile document, computed in one query from
+    ``updated_at`` and the count / newest row of experiences and educations.
+    Returns ``None`` when the user has no profile.
+    """
+    return _profile_tag(_profile_stats(user_id).first())
+
+
+async def aprofile_etag(user_id):
+    return _profile_tag(await _profile_stats(user_id).afirst())
+
+
+def post_etag(post):
+    """
+    Validator for a post document, from the post's own state: every write
+    to the post, its likes or its comments bumps ``updated_at``.
+    """
+    state = (post.id, post.updated_at.isoformat(), post.likes_count, post.comments_count)
+    digest = hashlib.sha1('|'.join(map(str, state)).encode()).hexdigest()
+    return f'"post-{digest}"'
+
+
+def matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = [tag.removeprefix('W/') for tag in parse_etags(header)]
+    return '*' in etags or etag in etags
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,9 @@
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    # Keep DRF errors in the same {"error": ...} shape the views return
+    response = drf_exception_handler(exc, context)
+    if response is not None and isinstance(response.data, dict) and 'detail' in response.data:
+        response.data = {"error": response.data.pop('detail'), **response.data}
+    return response
@@ -0,0 +1,95 @@
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api import assistant
+
+
+def _summary(label, total, elapsed, timings):
+    timings = sorted(timings)
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    return (
+        f"{label:22} {total / elapsed:8.1f} req/s  p50 {statistics.median(timings):8.1f} ms  p95 {p95:8.1f} ms"
+    )
+
+
+class Command(BaseCommand):
+    help = "Benchmark the /openai/ proxy against api.assistant.FakeBackend: blocking workers vs async, cache hits, streaming."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32', help="Comma-separated numbers of concurrent clients.")
+        parser.add_argument('--requests', type=int, default=64, help="Requests per concurrency level.")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Threads for the blocking baseline (sync workers before this change).")
+        parser.add_argument('--delay', type=float, default=0.05, help="Fake model delay per word, in seconds.")
+
+    def handle(self, *args, **options):
+        levels = [int(n) for n in options['concurrency'].split(',')]
+        with override_settings(
+            ASSISTANT_BACKEND='api.assistant.FakeBackend',
+            ASSISTANT_FAKE_DELAY=options['delay'],
+            ASSISTANT_MAX_CONCURRENCY=max(levels),
+        ):
+            for concurrency in levels:
+                self.stdout.write(f"c={concurrency}")
+                self.stdout.write(self._blocking(concurrency, options['requests'], options['workers']))
+                self.stdout.write(asyncio.run(self._async(concurrency, options['requests'], cached=False)))
+                self.stdout.write(asyncio.run(self._async(concurrency, options['requests'], cached=True)))
+                self.stdout.write(asyncio.run(self._streaming(concurrency, options['requests'])))
+
+    def _prompt(self):
+        return f"benchmark prompt {uuid.uuid4().hex} with a few more words"
+
+    def _blocking(self, concurrency, total, workers):
+        # What the old view did: the whole completion held one worker thread
+        backend = assistant.get_backend()
+        complete = async_to_sync(backend.complete)
+
+        def call(_):
+            started = time.perf_counter()
+            complete(assistant.build_messages(self._prompt()))
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(workers, concurrency)) as pool:
+            timings = list(pool.map(call, range(total)))
+        return _summary(f"blocking ({workers} workers)", total, time.perf_counter() - started, timings)
+
+    async def _async(self, concurrency, total, cached):
+        prompt = self._prompt()
+        if cached:
+            await assistant.complete(prompt)
+        remaining = iter(range(total))
+        timings = []
+
+        async def client():
+            for _ in remaining:
+                started = time.perf_counter()
+                await assistant.complete(prompt if cached else self._prompt())
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return _summary("async (cached)" if cached else "async", total, time.perf_counter() - started, timings)
+
+    async def _streaming(self, concurrency, total):
+        remaining = iter(range(total))
+        first_token = []
+
+        async def client():
+            for _ in remaining:
+                started = time.perf_counter()
+                pieces = await assistant.stream(self._prompt())
+                first_token.append((time.perf_counter() - started) * 1000)
+                async for _ in pieces:
+                    pass
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return _summary("stream (first token)", total, time.perf_counter() - started, first_token)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory
+
+from api import async_views, views
+from api.models import Post, Profile, User
+
+
+def _render_sync(view):
+    # How the ASGI handler runs a sync DRF view: in a thread, then rendered
+    def call(request, **kwargs):
+        response = view(request, **kwargs)
+        response.render()
+        return response
+    return sync_to_async(call)
+
+
+async def _drain(response):
+    if response.streaming:
+        async for _ in response.streaming_content:
+            pass
+
+
+class Command(BaseCommand):
+    help = "Compare requests/sec and memory per concurrent request for the sync and async read views."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,10,50', help="Comma-separated numbers of concurrent requests.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and concurrency level.")
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by('-date').first()
+        user_id = Profile.objects.values_list('user_id', flat=True).first()
+        name = User.objects.values_list('name', flat=True).first()
+        if post is None or user_id is None:
+            self.stderr.write("Needs at least one post and one profile to benchmark against.")
+            return
+
+        rf = AsyncRequestFactory()
+        endpoints = [
+            ("GET /posts", lambda: rf.get('/posts', {'limit': '20'}), 'posts', {}),
+            ("GET /posts/<id>", lambda: rf.get(f'/posts/{post.id}'), 'post_detail', {'id': post.id}),
+            ("GET /profile?limit", lambda: rf.get('/profile', {'limit': '20'}), 'list_profiles', {}),
+            ("GET /profile/user/<id>", lambda: rf.get(f'/profile/user/{user_id}'), 'get_profile_by_user', {'id': user_id}),
+            ("GET /search/", lambda: rf.get('/search/', {'q': name[:3]}), 'search_profile_by_username', {}),
+        ]
+        levels = [int(n) for n in options['concurrency'].split(',')]
+
+        for label, make_request, view_name, kwargs in endpoints:
+            self.stdout.write(label)
+            for concurrency in levels:
+                for mode, view in (("sync", _render_sync(getattr(views, view_name))),
+                                   ("async", getattr(async_views, view_name))):
+                    rps, per_request = asyncio.run(
+                        self._run(view, make_request, kwargs, concurrency, options['requests'])
+                    )
+                    self.stdout.write(
+                        f"  {mode:5} c={concurrency:<4} {rps:9.1f} req/s  {per_request / 1024:8.1f} KiB peak per concurrent request"
+                    )
+
+    async def _run(self, view, make_request, kwargs, concurrency, total):
+        remaining = iter(range(total))
+
+        async def client():
+            for _ in remaining:
+                await _drain(await view(make_request(), **kwargs))
+
+        # Warm caches and connections outside the measurement
+        await _drain(await view(make_request(), **kwargs))
+        tracemalloc.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return total / elapsed, peak / concurrency
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import statistics
+import time
+
+from channels.db import database_sync_to_async
+from channels.sessions import CookieMiddleware
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+
+from api.authentication import create_token
+from api.management.commands.bench_http import percentile
+from api.models import Chat, ChatMember, Messages, User
+from chat.consumers import ChatConsumer, _message_doc, _record_last_message
+
+
+# Every message the benchmark writes carries this, so it can be removed afterwards
+MARKER = "[bench_chat]"
+
+
+class LegacyChatConsumer(ChatConsumer):
+    """new_chat as it used to run: a thread hop per step, then a re-fetch of the saved message."""
+
+    async def start_chat(self, receiver_id, text):
+        chat = await self._get_or_create_private_chat(receiver_id)
+        msg = Messages(chat_id=chat.id, sender_id=self.user.id, text=text)
+        await database_sync_to_async(msg.save)()
+        await database_sync_to_async(_record_last_message)(msg)
+        saved = await database_sync_to_async(lambda: Messages.objects.get(id=msg.id))()
+        receiver = await self.get_user(receiver_id)
+        return chat.id, receiver.name, _message_doc(saved)
+
+    @database_sync_to_async
+    def _get_or_create_private_chat(self, receiver_id):
+        key = Chat.pair_key_for(self.user.id, receiver_id)
+        try:
+            with transaction.atomic():
+                chat = Chat.objects.create(type="private", pair_key=key)
+                ChatMember.objects.bulk_create([ChatMember(chat=chat, user_id=self.user.id),
+                                                ChatMember(chat=chat, user_id=receiver_id)])
+            return chat
+        except IntegrityError:
+            return Chat.objects.get(pair_key=key)
+
+
+class Command(BaseCommand):
+    help = ("Per-message latency and messages/sec of the chat consumer's new_chat and send_message "
+            "at rising numbers of concurrent sockets, before and after the single-hop unit of work. "
+            "Writes to the database; run it against one seeded with seed_data, not production.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,16,64', help="Comma-separated numbers of concurrent sockets.")
+        parser.add_argument('--messages', type=int, default=20, help="Messages per socket and action.")
+
+    def handle(self, *args, **options):
+        levels = [int(n) for n in options['concurrency'].split(',')]
+        # Senders are connected, receivers are not, so each socket only sees its own replies
+        users = list(User.objects.order_by('id').values_list('id', flat=True)[:2 * max(levels)])
+        if len(users) < 2 * max(levels):
+            raise CommandError(f"Needs {2 * max(levels)} users; run seed_data with more users.")
+        pairs = list(zip(users[:max(levels)], users[max(levels):]))
+
+        keys = [Chat.pair_key_for(a, b) for a, b in pairs]
+        before = list(Chat.objects.filter(pair_key__in=keys).values(
+            'id', 'last_message_text', 'last_message_sender_id', 'last_message_time'))
+        try:
+            with override_settings(RATE_LIMITS={}):
+                for action in ("new_chat", "send_message"):
+                    self.stdout.write(action)
+                    for concurrency in levels:
+                        for name, consumer in (("multi-hop", LegacyChatConsumer), ("single-hop", ChatConsumer)):
+                            if action == "send_message" and consumer is LegacyChatConsumer:
+                                continue
+                            timings, elapsed = asyncio.run(
+                                self._run(consumer, action, pairs[:concurrency], options['messages'])
+                            )
+                            self.stdout.write(
+                                f"  {name:10} c={concurrency:<4} {len(timings) / elapsed:8.1f} msg/s  "
+                                f"p50 {statistics.median(timings):7.2f}  p95 {percentile(timings, 95):7.2f}  "
+                                f"p99 {percentile(timings, 99):7.2f} ms"
+                            )
+        finally:
+            Messages.objects.filter(text__startswith=MARKER).delete()
+            Chat.objects.filter(pair_key__in=keys).exclude(id__in=[row['id'] for row in before]).delete()
+            Chat.objects.bulk_update([Chat(**row) for row in before],
+                                     ['last_message_text', 'last_message_sender_id', 'last_message_time'])
+
+    async def _run(self, consumer, action, pairs, count):
+        app = CookieMiddleware(consumer.as_asgi())
+        sockets = []
+        for sender, _ in pairs:
+            socket = WebsocketCommunicator(app, "/ws/chat/", headers=[(b"cookie", f"token={create_token(sender)}".encode())])
+            connected, _ = await socket.connect()
+            if not connected:
+                raise CommandError(f"Could not connect as {sender}.")
+            await socket.receive_json_from()
+            sockets.append(socket)
+
+        async def exchange(socket, receiver_id, chat_id, n):
+            text = f"{MARKER} {n}"
+            if action == "new_chat":
+                payload, replies = {"receiver_id": str(receiver_id), "text": text}, 2
+            else:
+                payload, replies = {"chat_id": chat_id, "text": text}, 1
+            started = time.perf_counter()
+            await socket.send_to(text_data=json.dumps({"action": action, "message": payload}))
+            # new_chat also answers with new_chat_created, in either order
+            replies = [await socket.receive_json_from(timeout=60) for _ in range(replies)]
+            elapsed = (time.perf_counter() - started) * 1000
+            echo = next((r for r in replies if r.get("type") == "chat_message"), None)
+            if echo is None:
+                raise CommandError(f"{action} failed: {replies}")
+            return elapsed, echo["message"]["chat_id"]
+
+        # One unmeasured round trip per socket also creates the pair's chat
+        chat_ids = [
+            chat_id for _, chat_id in await asyncio.gather(*(
+                exchange(socket, receiver, None, "warmup") for socket, (_, receiver) in zip(sockets, pairs)
+            ))
+        ] if action == "new_chat" else [
+            await database_sync_to_async(Chat.objects.values_list('id', flat=True).get)(pair_key=Chat.pair_key_for(*pair))
+            for pair in pairs
+        ]
+
+        async def client(socket, receiver_id, chat_id):
+            return [(await exchange(socket, receiver_id, str(chat_id), n))[0] for n in range(count)]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            client(socket, receiver, chat_id) for socket, (_, receiver), chat_id in zip(sockets, pairs, chat_ids)
+        ))
+        elapsed = time.perf_counter() - started
+        for socket in sockets:
+            await socket.disconnect()
+        return sorted(t for timings in results for t in timings), elapsed
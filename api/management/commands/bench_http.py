@@ -0,0 +1,229 @@
+import json
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import create_token
+from api.models import Post, User
+
+
+def percentile(timings, pct):
+    # Nearest rank on sorted timings
+    if not timings:
+        return None
+    return timings[min(len(timings) - 1, max(0, int(round(pct / 100 * len(timings))) - 1))]
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class InProcess:
+    """Requests through django.test.Client: the full middleware stack, no sockets."""
+
+    name = "in-process"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, headers):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        extra = {f"HTTP_{key.upper().replace('-', '_')}": value for key, value in headers.items()}
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.generic(method, path, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(ctx)
+
+    def queries(self, route):
+        return None
+
+    def done(self):
+        connections.close_all()
+
+
+class Remote:
+    """Requests over HTTP to a running server; queries come from its /metrics."""
+
+    name = "http"
+    _QUERIES_RE = re.compile(r'^devconnector_http_request_db_queries_total\{route="([^"]+)",[^}]*\} (\S+)$', re.M)
+    _COUNT_RE = re.compile(r'^devconnector_http_request_duration_seconds_count\{route="([^"]+)",[^}]*\} (\S+)$', re.M)
+
+    def __init__(self, base_url, metrics_token=None):
+        self.base_url = base_url.rstrip('/')
+        self.metrics_token = metrics_token
+        self._before = {}
+
+    def request(self, method, path, headers):
+        req = urllib.request.Request(self.base_url + path, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, None
+
+    def _scrape(self):
+        headers = {'Authorization': f"Bearer {self.metrics_token}"} if self.metrics_token else {}
+        try:
+            req = urllib.request.Request(self.base_url + '/metrics', headers=headers)
+            with urllib.request.urlopen(req, timeout=10) as response:
+                text = response.read().decode()
+        except (urllib.error.URLError, OSError):
+            return None
+        totals = {}
+        for pattern, index in ((self._QUERIES_RE, 0), (self._COUNT_RE, 1)):
+            for route, value in pattern.findall(text):
+                totals.setdefault(route, [0.0, 0.0])[index] += float(value)
+        return totals
+
+    def mark(self):
+        self._before = self._scrape()
+
+    def queries(self, route):
+        # Server-wide counters, so this is only exact when nothing else hits the route
+        after = self._scrape()
+        if self._before is None or after is None or route not in after:
+            return None
+        queries, count = after[route]
+        before_queries, before_count = self._before.get(route, (0.0, 0.0))
+        if count == before_count:
+            return None
+        return round((queries - before_queries) / (count - before_count), 2)
+
+    def done(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = ("Drive the main REST routes in-process or against a running server and report req/s, p50/p95/p99 "
+            "latency and queries per request as JSON, for comparing commits. Seed data first with seed_data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server (default: in-process test client).")
+        parser.add_argument('--metrics-token', help="METRICS_TOKEN of the server, for queries per request.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=500, help="Measured requests per route.")
+        parser.add_argument('--warmup', type=int, default=20, help="Unmeasured requests per route first.")
+        parser.add_argument('--routes', help="Comma-separated route names to run (default: all).")
+        parser.add_argument('--cold', action='store_true',
+                            help="In-process only: clear the cache before every request.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--compare', help="Earlier JSON report to print req/s and p95 changes against.")
+
+    def handle(self, *args, **options):
+        if options['url'] and options['cold']:
+            raise CommandError("--cold only applies to in-process runs.")
+        post = Post.objects.order_by('-date').values('id').first()
+        user = User.objects.filter(profiles__isnull=False).values('id', 'name').first()
+        if post is None or user is None:
+            raise CommandError("Needs posts and profiles to benchmark against; run seed_data first.")
+        auth = {'X-Auth-Token': create_token(user['id'])}
+
+        # (label, url name for /metrics, method, path, headers)
+        routes = [
+            ("GET /posts", 'posts', 'GET', '/posts?limit=20', {}),
+            ("GET /posts/<id>", 'post_detail', 'GET', f"/posts/{post['id']}", {}),
+            ("GET /profile", 'list_profiles', 'GET', '/profile?limit=20', {}),
+            ("GET /profile?skill", 'list_profiles', 'GET', '/profile?limit=20&skill=python', {}),
+            ("GET /profile/user/<id>", 'get_profile_by_user', 'GET', f"/profile/user/{user['id']}", {}),
+            ("GET /profile/me", 'get_profile_me', 'GET', '/profile/me', auth),
+            ("GET /search/", 'search_profile_by_username', 'GET', f"/search/?q={user['name'][:4]}", {}),
+        ]
+        if options['routes']:
+            wanted = {name.strip() for name in options['routes'].split(',')}
+            routes = [r for r in routes if r[1] in wanted or r[0] in wanted]
+
+        driver = Remote(options['url'], options['metrics_token']) if options['url'] else InProcess()
+        report = {
+            "commit": _commit(),
+            "driver": driver.name,
+            "vendor": connection.vendor,
+            "concurrency": options['concurrency'],
+            "requests": options['requests'],
+            "cold": options['cold'],
+            "routes": {},
+        }
+        # The test client's host, as the test runner allows it
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                for label, url_name, method, path, headers in routes:
+                    report["routes"][label] = self._run(driver, url_name, method, path, headers, options)
+                    self.stderr.write(self._line(label, report["routes"][label]))
+            finally:
+                driver.done()
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self._compare(json.load(f), report)
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+    def _run(self, driver, url_name, method, path, headers, options):
+        def one(_):
+            if options['cold']:
+                cache.clear()
+            started = time.perf_counter()
+            status, queries = driver.request(method, path, headers)
+            return (time.perf_counter() - started) * 1000, status, queries
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(one, range(options['warmup'])))
+            if isinstance(driver, Remote):
+                driver.mark()
+            started = time.perf_counter()
+            results = list(pool.map(one, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            # Worker threads keep their own DB connections
+            list(pool.map(lambda _: connections.close_all(), range(options['concurrency'])))
+
+        timings = sorted(ms for ms, _, _ in results)
+        counted = [q for _, _, q in results if q is not None]
+        queries = round(sum(counted) / len(counted), 2) if counted else driver.queries(url_name)
+        return {
+            "rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+            "errors": sum(1 for _, status, _ in results if status >= 400),
+            "queries_per_request": queries,
+        }
+
+    def _line(self, label, row):
+        queries = '-' if row['queries_per_request'] is None else row['queries_per_request']
+        return (f"{label:24} {row['rps']:8.1f} req/s  p50 {row['p50_ms']:7.2f}  p95 {row['p95_ms']:7.2f}"
+                f"  p99 {row['p99_ms']:7.2f} ms  queries {queries}  errors {row['errors']}")
+
+    def _compare(self, baseline, report):
+        self.stderr.write(f"\nvs {baseline.get('commit') or 'baseline'}")
+        for label, row in report["routes"].items():
+            old = baseline.get("routes", {}).get(label)
+            if not old:
+                continue
+            rps = (row['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+            p95 = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            self.stderr.write(f"{label:24} req/s {rps:+6.1f}%  p95 {p95:+6.1f}%  "
+                              f"queries {old['queries_per_request']} -> {row['queries_per_request']}")
@@ -0,0 +1,98 @@
+import importlib
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+from api.models import Chat, Comment, Education, Experience, Messages, Post, Profile
+from api.pagination import _keyset_slice, keyset_page
+
+
+# The indexes added in 0005 (name starts with a digit, so no plain import)
+INDEXES = importlib.import_module('api.migrations.0005_access_path_indexes').INDEXES
+
+# What they replaced: the single-column foreign key indexes from 0001
+LEGACY_FK_INDEXES = [
+    (Comment, 'post'), (Experience, 'profile'), (Education, 'profile'), (Messages, 'chat'),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN and time the hot read queries with and without the 0005 access-path indexes. "
+            "The 'before' pass drops them inside a transaction that is rolled back, so run it against "
+            "a benchmark database seeded with seed_data, not production.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help="Timed executions per query.")
+        parser.add_argument('--plans', action='store_true', help="Print the full plans, not just the first line.")
+
+    def handle(self, *args, **options):
+        post_id = Comment.objects.values_list('post_id', flat=True).first()
+        profile_id = Experience.objects.values_list('profile_id', flat=True).first()
+        user_id = Profile.objects.values_list('user_id', flat=True).first()
+        chat_id = Messages.objects.values_list('chat_id', flat=True).first()
+        if None in (post_id, profile_id, user_id, chat_id):
+            raise CommandError("Needs posts, comments, profiles and messages; run seed_data first.")
+        cursor = keyset_page(Post.objects.values('id', 'date'), None, 20)[1]
+
+        queries = [
+            ("feed page", lambda: Post.objects.order_by('-date', '-id').values('id')[:21]),
+            ("feed page (cursor)", lambda: _keyset_slice(Post.objects.values('id', 'date'), cursor, 20, 'date')),
+            ("profiles page", lambda: Profile.objects.order_by('-created_at', '-id').values('id')[:21]),
+            ("comments of post", lambda: Comment.objects.filter(post_id=post_id).order_by('-date')),
+            ("experience of profile", lambda: Experience.objects.filter(profile_id__in=[profile_id]).order_by('-from_date')),
+            ("education of profile", lambda: Education.objects.filter(profile_id__in=[profile_id]).order_by('-from_date')),
+            ("profile by user", lambda: Profile.objects.filter(user_id=user_id).order_by('id')[:1]),
+            ("last message of chat", lambda: Messages.objects.filter(chat_id=chat_id).order_by('-time', '-id')[:1]),
+            ("chat history page", lambda: Messages.objects.filter(chat_id=chat_id).order_by('-time', '-id')[:50]),
+        ]
+
+        counts = {m.__name__: m.objects.count() for m in (Post, Profile, Comment, Experience, Messages, Chat)}
+        self.stdout.write(f"{connection.vendor}, " + ', '.join(f"{n} {name}" for name, n in counts.items()))
+
+        before = {}
+        try:
+            with transaction.atomic():
+                self._use_legacy_indexes()
+                before = self._measure(queries, options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        after = self._measure(queries, options)
+
+        for label, _ in queries:
+            (old_ms, old_plan), (new_ms, new_plan) = before[label], after[label]
+            self.stdout.write(f"\n{label}: p50 {old_ms:.3f} ms -> {new_ms:.3f} ms ({old_ms / new_ms if new_ms else 0:.1f}x)")
+            for name, plan in (("before", old_plan), ("after", new_plan)):
+                lines = plan.splitlines() if options['plans'] else plan.splitlines()[:1]
+                for n, line in enumerate(lines):
+                    self.stdout.write(f"  {name if n == 0 else '':6}  {line}")
+
+    def _use_legacy_indexes(self):
+        # Plain DDL statements: SQLite's schema editor refuses to run inside a transaction
+        editor = connection.schema_editor()
+        statements = [f"DROP INDEX {connection.ops.quote_name(index.name)}" for _, index in INDEXES]
+        statements += [
+            models.Index(fields=[field], name=f"bench_{model._meta.model_name}_fk").create_sql(model, editor)
+            for model, field in LEGACY_FK_INDEXES
+        ]
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(str(statement))
+
+    def _measure(self, queries, options):
+        results = {}
+        for label, build in queries:
+            plan = build().explain()
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(timings), plan
+        return results
@@ -0,0 +1,79 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from api import views
+from api.models import User
+
+
+def legacy_login(user, raw_password):
+    # What login did before: PBKDF2 inline on the request thread, no rehash
+    return 200 if hashers.check_password(raw_password, user.password) else 400
+
+
+class Command(BaseCommand):
+    help = "Measure /login/ throughput at several concurrency levels, inline hashing vs the api.passwords pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,4,16,64',
+                            help="Comma-separated numbers of concurrent clients.")
+        parser.add_argument('--requests', type=int, default=200, help="Logins per concurrency level.")
+        parser.add_argument('--iterations', type=int, default=0,
+                            help="PBKDF2 iterations to benchmark with (default: PASSWORD_PBKDF2_ITERATIONS).")
+
+    def handle(self, *args, **options):
+        levels = [int(n) for n in options['concurrency'].split(',')]
+        # The login rate limit would answer most of the run with fast 429s
+        overrides = {'RATE_LIMITS': {}}
+        if options['iterations']:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = options['iterations']
+
+        with override_settings(**overrides):
+            password = uuid.uuid4().hex
+            user = User(name=f"bench-{password[:12]}", email=f"{password[:12]}@bench.example.com")
+            user.set_password(password)
+            user.save()
+            try:
+                self.stdout.write(f"{hashers.get_hasher().iterations} PBKDF2 iterations, {options['requests']} logins per level")
+                for concurrency in levels:
+                    self._run("inline", concurrency, options['requests'], lambda: legacy_login(user, password))
+                    self._run("pool", concurrency, options['requests'], lambda: self._login(user.email, password))
+            finally:
+                user.delete()
+
+    def _login(self, email, password):
+        request = RequestFactory().post('/login/', {'email': email, 'password': password}, content_type='application/json')
+        try:
+            return views.login(request).status_code
+        finally:
+            connection.close()
+
+    def _run(self, label, concurrency, total, fn):
+        def timed(_):
+            started = time.perf_counter()
+            result = fn()
+            return (time.perf_counter() - started) * 1000, result
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(total)))
+        elapsed = time.perf_counter() - started
+
+        # Only successful logins are timed; anything else is counted, not averaged in
+        timings = sorted(ms for ms, status in results if status == 200)
+        errors = len(results) - len(timings)
+        busy = sum(1 for _, status in results if status == 503)
+        if not timings:
+            self.stdout.write(f"{label:6} c={concurrency:<4} no successful logins  errors {errors} (503s {busy})")
+            return
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"{label:6} c={concurrency:<4} {len(timings) / elapsed:8.1f} logins/s  p50 {statistics.median(timings):8.2f} ms"
+            f"  p95 {p95:8.2f} ms  errors {errors} (503s {busy})"
+        )
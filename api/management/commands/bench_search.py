@@ -0,0 +1,76 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import User
+from api.search import search_users
+
+
+def legacy_search(query):
+    # What /search/ did before: unbounded icontains, every match materialized
+    return [{"id": u.id, "name": u.name} for u in User.objects.filter(name__icontains=query)]
+
+
+class Command(BaseCommand):
+    help = "Compare /search/ latency: legacy icontains scan vs api.search.search_users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0,
+                            help="Seed random users until the table holds at least this many (e.g. 1000000).")
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self._seed(options['users'], rng)
+
+        total = User.objects.count()
+        names = list(User.objects.order_by('?').values_list('name', flat=True)[:options['queries']])
+        if not names:
+            self.stderr.write("No users to search; pass --users N to seed some.")
+            return
+
+        # Mix of keystroke-style prefixes, inner substrings and typos
+        queries = []
+        for name in names:
+            kind = rng.random()
+            if kind < 0.5:
+                queries.append(name[:rng.randint(2, max(2, len(name)))])
+            elif kind < 0.8:
+                start = rng.randint(0, max(0, len(name) - 3))
+                queries.append(name[start:start + 3])
+            else:
+                pos = rng.randrange(len(name))
+                queries.append(name[:pos] + rng.choice(string.ascii_lowercase) + name[pos + 1:])
+
+        self.stdout.write(f"{connection.vendor}, {total} users, {len(queries)} queries")
+        for label, fn in (("legacy icontains", legacy_search), ("search_users", search_users)):
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                fn(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"{label:18} mean {statistics.mean(timings):8.2f} ms  p50 {statistics.median(timings):8.2f} ms"
+                f"  p95 {p95:8.2f} ms"
+            )
+
+    def _seed(self, target, rng, batch_size=10000):
+        missing = target - User.objects.count()
+        while missing > 0:
+            size = min(batch_size, missing)
+            users = []
+            for _ in range(size):
+                name = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) + str(rng.randrange(10 ** 6))
+                users.append(User(name=name, email=f"{name}@bench.example.com", password="!"))
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            missing -= size
+            self.stdout.write(f"seeded {target - max(missing, 0)}/{target}", ending='\r')
+        if target:
+            self.stdout.write("")
@@ -0,0 +1,92 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api import serializers
+from api.models import Education, Experience, Profile, User
+from api.renderers import ORJSONRenderer
+
+
+def legacy_document(user_id):
+    # The per-view code this benchmark replaced: model instances, strftime,
+    # str(uuid) per row and DRF's stock JSON renderer.
+    user = User.objects.get(id=user_id)
+    profile = Profile.objects.get(user=user)
+    exp = [{
+        "_id": str(e.id),
+        "company": e.company,
+        "from": e.from_date.strftime('%Y-%m-%d') if e.from_date else "",
+        "title": e.title,
+        "location": e.location or "",
+        "description": e.description or "",
+    } for e in profile.experiences.all().order_by('-from_date')]
+    edu = [{
+        "_id": str(ed.id),
+        "school": ed.school,
+        "fieldofstudy": ed.field_of_study,
+        "description": ed.description or "",
+        "degree": ed.degree,
+        "from": ed.from_date.strftime('%Y-%m-%d') if ed.from_date else "",
+    } for ed in profile.educations.all().order_by('-from_date')]
+    return {
+        "user": {"_id": str(user.id), "name": user.name, "avatar": ""},
+        "status": profile.profession,
+        "company": profile.company or "",
+        "location": profile.location or "",
+        "bio": profile.bio or "",
+        "skills": [ps.skill.name for ps in profile.profile_skills.select_related('skill').order_by('position')],
+        "social": {
+            "facebook": profile.facebook or "",
+            "instagram": profile.instagram or "",
+            "linkedin": profile.linkedin or "",
+            "twitter": profile.twitter or "",
+            "youtube": profile.youtube or "",
+        },
+        "experience": exp,
+        "education": edu,
+    }
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark profile serialization: legacy per-view code vs api.serializers + orjson."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=60, help="Experience and education rows each.")
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+
+        # Seed inside a transaction that is always rolled back
+        with transaction.atomic():
+            user = User.objects.create(name="bench-serializers", email="bench-serializers@example.com")
+            profile = Profile.objects.create(user=user, profession="Developer")
+            profile.set_skills("python, django, sql")
+            start = datetime.date(2000, 1, 1)
+            Experience.objects.bulk_create(Experience(
+                profile=profile, title=f"Engineer {i}", company=f"Company {i}", location="Remote",
+                from_date=start + datetime.timedelta(days=30 * i), description="x" * 200,
+            ) for i in range(rows))
+            Education.objects.bulk_create(Education(
+                profile=profile, school=f"School {i}", degree="BSc", field_of_study="CS",
+                from_date=start + datetime.timedelta(days=30 * i), description="y" * 200,
+            ) for i in range(rows))
+
+            legacy = self._run(iterations, lambda: JSONRenderer().render(legacy_document(user.id)))
+            fast = self._run(iterations, lambda: ORJSONRenderer().render(serializers.load_profile_document(user.id)))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"profile with {rows} experience + {rows} education rows, {iterations} iterations")
+        self.stdout.write(f"legacy (models + strftime + JSONRenderer): {legacy:10.1f} docs/s")
+        self.stdout.write(f"values() + ORJSONRenderer:                 {fast:10.1f} docs/s")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {fast / legacy:.2f}x"))
+
+    def _run(self, iterations, fn):
+        fn()  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return iterations / (time.perf_counter() - started)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api.models import Comment, Post
+
+
+def real_count(model):
+    return Coalesce(Subquery(
+        model.objects.filter(post_id=OuterRef('pk'))
+        .values('post_id').annotate(n=Count('*')).values('n')
+    ), Value(0))
+
+
+class Command(BaseCommand):
+    help = "Compare Post.likes_count / comments_count with the real rows and optionally repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Rewrite drifted counters from the real data.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        Like = Post.likes.through
+        drifted = (
+            Post.objects
+            .annotate(real_likes=real_count(Like), real_comments=real_count(Comment))
+            .filter(~Q(likes_count=F('real_likes')) | ~Q(comments_count=F('real_comments')))
+            .values_list('id', 'likes_count', 'real_likes', 'comments_count', 'real_comments')
+        )
+
+        ids = []
+        for post_id, likes, real_likes, comments, real_comments in drifted.iterator(chunk_size=options['batch_size']):
+            ids.append(post_id)
+            self.stdout.write(
+                f"{post_id}: likes {likes} -> {real_likes}, comments {comments} -> {real_comments}"
+            )
+
+        # Repair after the scan so the read cursor is never open during writes
+        if options['fix']:
+            size = options['batch_size']
+            for start in range(0, len(ids), size):
+                self._fix(ids[start:start + size])
+
+        found = len(ids)
+        if not found:
+            self.stdout.write(self.style.SUCCESS("All post counters are correct."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {found} post(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{found} post(s) drifted; rerun with --fix to repair."))
+
+    def _fix(self, ids):
+        Post.objects.filter(id__in=ids).update(
+            likes_count=real_count(Post.likes.through),
+            comments_count=real_count(Comment),
+        )
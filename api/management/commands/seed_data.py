@@ -0,0 +1,209 @@
+import datetime
+import random
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import (
+    Chat, ChatMember, Comment, Education, Experience, Messages, Post, Profile, ProfileSkill, Skill, User,
+)
+
+
+SKILLS = ["Python", "Django", "JavaScript", "TypeScript", "React", "Vue", "Go", "Rust", "Java",
+          "Kotlin", "SQL", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "GraphQL", "C++"]
+PROFESSIONS = ["Developer", "Senior Developer", "Student", "Instructor", "Manager", "Intern"]
+LOCATIONS = ["Remote", "Berlin", "Tashkent", "New York", "London", "Bangalore", "Sao Paulo"]
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt "
+         "ut labore et dolore magna aliqua enim ad minim veniam quis nostrud exercitation").split()
+
+
+def _uuid(rng):
+    # Ids come from the seeded generator too, so a rerun with the same
+    # arguments produces the same rows and benchmarks hit the same keys
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = ("Bulk-generate users with profiles, experience, education, posts, likes, comments, chats and "
+            "messages for benchmarking. The same --seed and sizes always produce the same data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts-per-user', type=int, default=5)
+        parser.add_argument('--likes-per-post', type=int, default=10)
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument('--experience-per-user', type=int, default=2)
+        parser.add_argument('--education-per-user', type=int, default=1)
+        parser.add_argument('--skills-per-user', type=int, default=4)
+        parser.add_argument('--chats-per-user', type=int, default=3)
+        parser.add_argument('--messages-per-chat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users handled per bulk_create round.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed', help="Prefix of the generated user names and emails.")
+        parser.add_argument('--password', default='password123', help="Password every generated user can log in with.")
+        parser.add_argument('--clear', action='store_true', help="Delete users (and their data) under --prefix first.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        prefix = options['prefix']
+        if options['clear']:
+            self._clear(prefix, options['batch_size'])
+        if User.objects.filter(name__startswith=f"{prefix}-").exists():
+            self.stderr.write(f"Users named {prefix}-* already exist; pass --clear or another --prefix.")
+            return
+
+        # Prefix in the seed so runs under different prefixes get different ids
+        rng = random.Random(f"{prefix}:{options['seed']}")
+        user_ids = [_uuid(rng) for _ in range(options['users'])]
+        if not user_ids:
+            return
+
+        Skill.objects.bulk_create(
+            [Skill(name=name, slug=name.lower()) for name in SKILLS], ignore_conflicts=True
+        )
+        skill_ids = list(Skill.objects.filter(slug__in=[s.lower() for s in SKILLS]).values_list('id', flat=True))
+        encoded = make_password(options['password'])
+
+        counts = dict.fromkeys(('users', 'posts', 'likes', 'comments', 'chats', 'messages'), 0)
+        names = {uid: f"{prefix}-{i:07}" for i, uid in enumerate(user_ids)}
+        size = options['batch_size']
+
+        # Users first, so likes, comments and chats can point at any of them
+        for batch in _chunks(user_ids, size):
+            User.objects.bulk_create([
+                User(id=uid, name=names[uid], email=f"{names[uid]}@seed.example.com", password=encoded)
+                for uid in batch
+            ])
+            counts['users'] += len(batch)
+            self.stdout.write(f"users {counts['users']}/{len(user_ids)}", ending='\r')
+        self.stdout.write("")
+
+        for n, batch in enumerate(_chunks(user_ids, size)):
+            with transaction.atomic():
+                self._seed_profiles(batch, skill_ids, rng, options)
+                self._seed_posts(batch, user_ids, names, rng, options, counts)
+            self.stdout.write(f"profiles and posts {min((n + 1) * size, len(user_ids))}/{len(user_ids)}", ending='\r')
+        self.stdout.write("")
+
+        self._seed_chats(user_ids, rng, options, counts)
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f"{n} {name}" for name, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s"))
+
+    def _clear(self, prefix, size):
+        ids = list(User.objects.filter(name__startswith=f"{prefix}-").values_list('id', flat=True))
+        for batch in _chunks(ids, size):
+            chat_ids = ChatMember.objects.filter(user_id__in=batch).values('chat_id')
+            Chat.objects.filter(id__in=chat_ids).delete()
+            User.objects.filter(id__in=batch).delete()
+        self.stdout.write(f"Deleted {len(ids)} users named {prefix}-*")
+
+    def _seed_profiles(self, batch, skill_ids, rng, options):
+        profiles = [
+            Profile(id=_uuid(rng), user_id=uid, profession=rng.choice(PROFESSIONS), company=f"Company {rng.randrange(500)}",
+                    location=rng.choice(LOCATIONS), github_username=f"gh-{uid.hex[:12]}", bio=_text(rng, 8, 30))
+            for uid in batch
+        ]
+        Profile.objects.bulk_create(profiles)
+
+        per_profile = min(options['skills_per_user'], len(skill_ids))
+        ProfileSkill.objects.bulk_create([
+            ProfileSkill(profile_id=p.id, skill_id=skill_id, position=n)
+            for p in profiles for n, skill_id in enumerate(rng.sample(skill_ids, per_profile))
+        ])
+
+        # Fixed reference date rather than today(), so reruns match
+        ref = datetime.date(2025, 1, 1)
+        Experience.objects.bulk_create([
+            Experience(id=_uuid(rng), profile_id=p.id, title=rng.choice(PROFESSIONS),
+                       company=f"Company {rng.randrange(500)}", location=rng.choice(LOCATIONS),
+                       from_date=ref - datetime.timedelta(days=400 * (n + 1)),
+                       to_date=None if n == 0 else ref - datetime.timedelta(days=400 * n),
+                       current=n == 0, description=_text(rng, 5, 15))
+            for p in profiles for n in range(options['experience_per_user'])
+        ])
+        Education.objects.bulk_create([
+            Education(id=_uuid(rng), profile_id=p.id, school=f"University {rng.randrange(200)}", degree="BSc",
+                      field_of_study="Computer Science", from_date=ref - datetime.timedelta(days=3000 + 1500 * n),
+                      to_date=ref - datetime.timedelta(days=1600 + 1500 * n))
+            for p in profiles for n in range(options['education_per_user'])
+        ])
+
+    def _seed_posts(self, batch, user_ids, names, rng, options, counts):
+        posts = [
+            Post(id=_uuid(rng), user_id=uid, name=names[uid], text=_text(rng, 10, 60))
+            for uid in batch for _ in range(options['posts_per_user'])
+        ]
+        likes, comments = [], []
+        per_post = min(options['likes_per_post'], len(user_ids))
+        for post in posts:
+            likes.extend(Post.likes.through(post_id=post.id, user_id=uid) for uid in rng.sample(user_ids, per_post))
+            for _ in range(options['comments_per_post']):
+                author = rng.choice(user_ids)
+                comments.append(Comment(id=_uuid(rng), post_id=post.id, user_id=author,
+                                        name=names[author], text=_text(rng, 3, 20)))
+            # Counters match the rows, as check_post_counters expects
+            post.likes_count = per_post
+            post.comments_count = options['comments_per_post']
+
+        Post.objects.bulk_create(posts)
+        Post.likes.through.objects.bulk_create(likes)
+        Comment.objects.bulk_create(comments)
+        counts['posts'] += len(posts)
+        counts['likes'] += len(likes)
+        counts['comments'] += len(comments)
+
+    def _seed_chats(self, user_ids, rng, options, counts):
+        if len(user_ids) < 2 or not options['chats_per_user']:
+            return
+        pairs = set()
+        for uid in user_ids:
+            for peer in rng.sample(user_ids, min(options['chats_per_user'] + 1, len(user_ids))):
+                if peer != uid:
+                    pairs.add((uid, peer) if uid < peer else (peer, uid))
+        pairs = sorted(pairs)
+
+        per_chat = options['messages_per_chat']
+        now = timezone.now()
+        for batch in _chunks(pairs, options['batch_size']):
+            chats, messages = [], []
+            for a, b in batch:
+                chat = Chat(id=_uuid(rng), type="private", pair_key=Chat.pair_key_for(a, b))
+                # Conversations end at different points of the last month, a minute per message
+                last = now - datetime.timedelta(minutes=rng.randrange(30 * 24 * 60))
+                messages.extend(
+                    Messages(id=_uuid(rng), chat_id=chat.id, sender_id=(a, b)[n % 2], text=_text(rng, 2, 25),
+                             time=last - datetime.timedelta(minutes=per_chat - 1 - n))
+                    for n in range(per_chat)
+                )
+                # The chat list reads the newest message off the chat row
+                if per_chat:
+                    chat.last_message_text = messages[-1].text
+                    chat.last_message_sender_id = messages[-1].sender_id
+                    chat.last_message_time = messages[-1].time
+                chats.append(chat)
+            with transaction.atomic():
+                Chat.objects.bulk_create(chats)
+                ChatMember.objects.bulk_create(
+                    ChatMember(chat_id=chat.id, user_id=uid) for chat, pair in zip(chats, batch) for uid in pair
+                )
+                for rows in _chunks(messages, 5000):
+                    Messages.objects.bulk_create(rows)
+            counts['chats'] += len(chats)
+            counts['messages'] += len(messages)
+            self.stdout.write(f"chats {counts['chats']}/{len(pairs)}", ending='\r')
+        self.stdout.write("")
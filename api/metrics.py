@@ -0,0 +1,316 @@
+"""
+Request and WebSocket action metrics, exposed in Prometheus text format at
+``/metrics``.
+
+``MetricsMiddleware`` records latency, DB query count and DB time per
+resolved URL name; ``ChatConsumer`` does the same per action through
+``observe_ws``. Queries are attributed through a context variable that a
+wrapper installed on every DB connection checks, so ORM calls made from
+``sync_to_async`` threads count towards the request that awaited them.
+A streamed response is measured until its body has been sent and closed.
+
+Each thread writes to its own shard of counters, so recording takes no
+lock; ``render`` sums the shards when scraped.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_db_usage = contextvars.ContextVar('db_usage', default=None)
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'total', 'queries', 'db_seconds')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def observe(self, seconds, queries, db_seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.queries += queries
+        self.db_seconds += db_seconds
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, key, seconds, queries=0, db_seconds=0.0):
+        shard = self._shard()
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = _Series()
+        series.observe(seconds, queries, db_seconds)
+
+    def collect(self):
+        """``{key: _Series}`` summed over every thread's shard."""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for key, series in list(shard.items()):
+                total = merged.get(key)
+                if total is None:
+                    total = merged[key] = _Series()
+                for i, n in enumerate(series.buckets):
+                    total.buckets[i] += n
+                total.count += series.count
+                total.total += series.total
+                total.queries += series.queries
+                total.db_seconds += series.db_seconds
+        return merged
+
+
+http = Registry()
+ws = Registry()
+
+
+def _count_query(execute, sql, params, many, context):
+    usage = _db_usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage[0] += 1
+        usage[1] += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+# Connections opened before this module was imported
+for _connection in connections.all(initialized_only=True):
+    _install_query_counter(None, _connection)
+
+
+class _Measurement:
+    """Latency and queries of one request or action, from creation to ``finish``."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.usage = [0, 0.0]
+        self.started = time.perf_counter()
+        self.finished = False
+
+    @contextmanager
+    def active(self):
+        """Attribute the queries made inside the block to this measurement."""
+        token = _db_usage.set(self.usage)
+        try:
+            yield
+        finally:
+            _db_usage.reset(token)
+
+    def finish(self, key):
+        if not self.finished:
+            self.finished = True
+            self.registry.observe(key, time.perf_counter() - self.started, self.usage[0], self.usage[1])
+
+
+@contextmanager
+def _measure(registry, key_fn):
+    measurement = _Measurement(registry)
+    try:
+        with measurement.active():
+            yield
+    finally:
+        measurement.finish(key_fn())
+
+
+def observe_ws(action):
+    """Context manager timing one ``ChatConsumer`` action and its queries."""
+    return _measure(ws, lambda: (str(action),))
+
+
+class _MeasuredStream:
+    # A streamed body does most of its work after the view returns: pull
+    # each chunk inside the request's measurement and record it on close(),
+    # which the server calls once the body is sent
+    def __init__(self, iterator, measurement, key):
+        self._iterator = iterator
+        self._measurement = measurement
+        self._key = key
+
+    def close(self):
+        self._measurement.finish(self._key)
+
+
+class _SyncMeasuredStream(_MeasuredStream):
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._measurement.active():
+            return next(self._iterator)
+
+
+# No __iter__ here: StreamingHttpResponse treats anything iterable as sync
+class _AsyncMeasuredStream(_MeasuredStream):
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        with self._measurement.active():
+            return await anext(self._iterator)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measurement = _Measurement(http)
+        try:
+            with measurement.active():
+                response = self.get_response(request)
+        except BaseException:
+            measurement.finish(_request_key(request, None))
+            raise
+        return _finish(request, response, measurement)
+
+    async def __acall__(self, request):
+        measurement = _Measurement(http)
+        try:
+            with measurement.active():
+                response = await self.get_response(request)
+        except BaseException:
+            measurement.finish(_request_key(request, None))
+            raise
+        return _finish(request, response, measurement)
+
+
+def _finish(request, response, measurement):
+    key = _request_key(request, response)
+    if not response.streaming:
+        measurement.finish(key)
+    elif response.is_async:
+        response.streaming_content = _AsyncMeasuredStream(aiter(response.streaming_content), measurement, key)
+    else:
+        response.streaming_content = _SyncMeasuredStream(iter(response.streaming_content), measurement, key)
+    return response
+
+
+_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+def _request_key(request, response):
+    # Labels only take bounded values so clients cannot blow up the series count
+    match = getattr(request, 'resolver_match', None)
+    route = match.url_name if match is not None and match.url_name else 'unmatched'
+    method = request.method if request.method in _METHODS else 'other'
+    status = response.status_code if response is not None else 500
+    return route, method, str(status)
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def _histogram(lines, metric, help_text, label_names, series_by_key):
+    lines.append(f"# HELP {metric}_duration_seconds {help_text}")
+    lines.append(f"# TYPE {metric}_duration_seconds histogram")
+    for key, series in sorted(series_by_key.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), series.buckets):
+            cumulative += n
+            le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+            lines.append(f"{metric}_duration_seconds_bucket{_labels(label_names, key, le)} {cumulative}")
+        lines.append(f"{metric}_duration_seconds_sum{_labels(label_names, key)} {series.total}")
+        lines.append(f"{metric}_duration_seconds_count{_labels(label_names, key)} {series.count}")
+
+    lines.append(f"# HELP {metric}_db_queries_total Database queries issued.")
+    lines.append(f"# TYPE {metric}_db_queries_total counter")
+    for key, series in sorted(series_by_key.items()):
+        lines.append(f"{metric}_db_queries_total{_labels(label_names, key)} {series.queries}")
+
+    lines.append(f"# HELP {metric}_db_seconds_total Time spent in database queries.")
+    lines.append(f"# TYPE {metric}_db_seconds_total counter")
+    for key, series in sorted(series_by_key.items()):
+        lines.append(f"{metric}_db_seconds_total{_labels(label_names, key)} {series.db_seconds}")
+
+
+def render():
+    from . import cache as posts_cache
+    from . import ratelimit
+
+    lines = []
+    _histogram(lines, 'devconnector_http_request', "HTTP request latency by URL name.",
+               ('route', 'method', 'status'), http.collect())
+    _histogram(lines, 'devconnector_ws_action', "ChatConsumer action latency.",
+               ('action',), ws.collect())
+
+    lines.append("# HELP devconnector_cache_requests_total Response cache lookups (api/cache.py).")
+    lines.append("# TYPE devconnector_cache_requests_total counter")
+    for name, counts in sorted(posts_cache.stats.snapshot().items()):
+        lines.append(f'devconnector_cache_requests_total{{cache="{name}",result="hit"}} {counts["hits"]}')
+        lines.append(f'devconnector_cache_requests_total{{cache="{name}",result="miss"}} {counts["misses"]}')
+
+    lines.append("# HELP devconnector_rate_limit_total Rate limit decisions (api/ratelimit.py).")
+    lines.append("# TYPE devconnector_rate_limit_total counter")
+    for scope, counts in sorted(ratelimit.stats.snapshot().items()):
+        lines.append(f'devconnector_rate_limit_total{{scope="{scope}",result="allowed"}} {counts["allowed"]}')
+        lines.append(f'devconnector_rate_limit_total{{scope="{scope}",result="rejected"}} {counts["rejected"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def authorized(request):
+    """
+    Whether ``request`` may read operational counters: always when no
+    ``METRICS_TOKEN`` is set, otherwise only with it as a bearer token.
+    """
+    # Optional bearer token so the endpoint can sit on a public host
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        return True
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+
+
+def metrics_view(request):
+    if not authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:41
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def _split(text):
+    names, seen = [], set()
+    for name in (text or '').split(','):
+        name = name.strip()[:100]
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def copy_skills_to_table(apps, schema_editor):
+    Profile = apps.get_model('api', 'Profile')
+    Skill = apps.get_model('api', 'Skill')
+    ProfileSkill = apps.get_model('api', 'ProfileSkill')
+
+    profiles = Profile.objects.order_by('id').values_list('id', 'skills')
+    last = None
+    while True:
+        page = profiles.filter(id__gt=last) if last else profiles
+        batch = [(pk, _split(text)) for pk, text in page[:BATCH_SIZE]]
+        if not batch:
+            break
+        last = batch[-1][0]
+        names = {}
+        for _, skills in batch:
+            for name in skills:
+                names.setdefault(name.lower(), name)
+        Skill.objects.bulk_create(
+            [Skill(name=name, slug=slug) for slug, name in names.items()], ignore_conflicts=True
+        )
+        ids = dict(Skill.objects.filter(slug__in=names).values_list('slug', 'id'))
+        ProfileSkill.objects.bulk_create(
+            ProfileSkill(profile_id=pk, skill_id=ids[name.lower()], position=i)
+            for pk, skills in batch
+            for i, name in enumerate(skills)
+        )
+
+
+def copy_skills_to_text(apps, schema_editor):
+    Profile = apps.get_model('api', 'Profile')
+    ProfileSkill = apps.get_model('api', 'ProfileSkill')
+
+    skills = {}
+    for profile_id, name in ProfileSkill.objects.order_by('position').values_list('profile_id', 'skill__name'):
+        skills.setdefault(profile_id, []).append(name)
+    for profile_id, names in skills.items():
+        Profile.objects.filter(id=profile_id).update(skills=', '.join(names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProfileSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_skills', to='api.profile')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_skills', to='api.skill')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='profileskill',
+            constraint=models.UniqueConstraint(fields=('skill', 'profile'), name='unique_profile_skill'),
+        ),
+        migrations.RunPython(copy_skills_to_table, copy_skills_to_text),
+        # Give the text column a default so unapplying can re-add it
+        migrations.AlterField(
+            model_name='profile',
+            name='skills',
+            field=models.TextField(default='', help_text='Comma-separated list of skills'),
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='skills',
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='profiles', through='api.ProfileSkill', to='api.skill'),
+        ),
+    ]
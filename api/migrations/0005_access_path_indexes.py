@@ -0,0 +1,77 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# (model, index) pairs matching how the code reads each table
+INDEXES = [
+    ('post', models.Index(fields=['-date', '-id'], name='api_post_date_id_idx')),
+    ('profile', models.Index(fields=['-created_at', '-id'], name='api_profile_created_id_idx')),
+    ('comment', models.Index(fields=['post', '-date'], name='api_comment_post_date_idx')),
+    ('experience', models.Index(fields=['profile', '-from_date'], name='api_experience_prof_from_idx')),
+    ('education', models.Index(fields=['profile', '-from_date'], name='api_education_prof_from_idx')),
+    ('messages', models.Index(fields=['chat', '-time', '-id'], name='api_messages_chat_time_idx')),
+]
+
+
+def create_indexes(apps, schema_editor):
+    # CONCURRENTLY on PostgreSQL so the tables stay writable during the build
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for model_name, index in INDEXES:
+        model = apps.get_model('api', model_name)
+        if concurrently:
+            schema_editor.add_index(model, index, concurrently=True)
+        else:
+            schema_editor.add_index(model, index)
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for model_name, index in INDEXES:
+        model = apps.get_model('api', model_name)
+        if concurrently:
+            schema_editor.remove_index(model, index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_user_name_trgm'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in INDEXES
+            ],
+        ),
+        # The composites lead with these foreign keys, so their single-column
+        # indexes only cost writes now. Dropped once the replacements exist.
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='api.post'),
+        ),
+        migrations.AlterField(
+            model_name='education',
+            name='profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='educations', to='api.profile'),
+        ),
+        migrations.AlterField(
+            model_name='experience',
+            name='profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='experiences', to='api.profile'),
+        ),
+        migrations.AlterField(
+            model_name='messages',
+            name='chat',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='api.chat'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_message(apps, schema_editor):
+    Chat = apps.get_model('api', 'Chat')
+    Messages = apps.get_model('api', 'Messages')
+
+    newest = Messages.objects.filter(chat_id=OuterRef('pk')).order_by('-time', '-id')
+    Chat.objects.update(
+        last_message_text=Subquery(newest.values('text')[:1]),
+        last_message_sender_id=Subquery(newest.values('sender_id')[:1]),
+        last_message_time=Coalesce(Subquery(newest.values('time')[:1]), F('last_message_time')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_sender_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_text',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['-last_message_time', '-id'], name='api_chat_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def _user_ids(values):
+    ids = []
+    for value in values or []:
+        try:
+            ids.append(uuid.UUID(str(value)))
+        except ValueError:
+            continue
+    return ids
+
+
+def copy_members_to_table(apps, schema_editor):
+    Chat = apps.get_model('api', 'Chat')
+    ChatMember = apps.get_model('api', 'ChatMember')
+    User = apps.get_model('api', 'User')
+
+    chats = Chat.objects.order_by('id').values_list('id', 'users_id')
+    last = None
+    while True:
+        page = chats.filter(id__gt=last) if last else chats
+        batch = [(pk, set(_user_ids(users))) for pk, users in page[:BATCH_SIZE]]
+        if not batch:
+            break
+        last = batch[-1][0]
+        # The JSON list was never checked against api_user; drop ids that do not exist
+        existing = set(User.objects.filter(
+            id__in={uid for _, users in batch for uid in users}
+        ).values_list('id', flat=True))
+        ChatMember.objects.bulk_create(
+            ChatMember(chat_id=pk, user_id=uid)
+            for pk, users in batch
+            for uid in users if uid in existing
+        )
+
+
+def copy_members_to_json(apps, schema_editor):
+    Chat = apps.get_model('api', 'Chat')
+    ChatMember = apps.get_model('api', 'ChatMember')
+
+    members = {}
+    for chat_id, user_id in ChatMember.objects.order_by('id').values_list('chat_id', 'user_id'):
+        members.setdefault(chat_id, []).append(str(user_id))
+    for chat_id, users in members.items():
+        Chat.objects.filter(id=chat_id).update(users_id=users)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_chat_last_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.chat')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='chat_memberships', to='api.user')),
+            ],
+        ),
+        migrations.RunPython(copy_members_to_table, copy_members_to_json),
+        # Added after the copy so the bulk insert is not checked row by row
+        migrations.AddConstraint(
+            model_name='chatmember',
+            constraint=models.UniqueConstraint(fields=('user', 'chat'), name='unique_chat_member'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='users',
+            field=models.ManyToManyField(related_name='chats', through='api.ChatMember', to='api.user'),
+        ),
+        migrations.RemoveField(
+            model_name='chat',
+            name='users_id',
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+BATCH_SIZE = 1000
+
+
+def set_pair_keys(apps, schema_editor):
+    Chat = apps.get_model('api', 'Chat')
+    ChatMember = apps.get_model('api', 'ChatMember')
+
+    chats = Chat.objects.filter(type='private').order_by('id').values_list('id', flat=True)
+    last = None
+    while True:
+        page = chats.filter(id__gt=last) if last else chats
+        ids = list(page[:BATCH_SIZE])
+        if not ids:
+            break
+        last = ids[-1]
+        members = {}
+        for chat_id, user_id in ChatMember.objects.filter(chat_id__in=ids).values_list('chat_id', 'user_id'):
+            members.setdefault(chat_id, []).append(str(user_id))
+        # Chats that lost a member to account deletion keep a NULL key
+        Chat.objects.bulk_update([
+            Chat(id=chat_id, pair_key=':'.join(sorted(users)))
+            for chat_id, users in members.items() if len(users) == 2
+        ], ['pair_key'])
+
+
+def merge_duplicate_pairs(apps, schema_editor):
+    """Fold every extra private chat of a pair into one, keeping all messages."""
+    Chat = apps.get_model('api', 'Chat')
+    Messages = apps.get_model('api', 'Messages')
+
+    duplicated = (
+        Chat.objects.filter(pair_key__isnull=False)
+        .values('pair_key').annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('pair_key', flat=True)
+    )
+    for pair_key in list(duplicated):
+        chats = list(Chat.objects.filter(pair_key=pair_key).order_by('-last_message_time', 'id'))
+        # The most recently active chat survives and already has the right last message
+        keep, extras = chats[0], [chat.id for chat in chats[1:]]
+        Messages.objects.filter(chat_id__in=extras).update(chat_id=keep.id)
+        Chat.objects.filter(id__in=extras).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_chat_members'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='pair_key',
+            field=models.CharField(blank=True, max_length=73, null=True),
+        ),
+        migrations.RunPython(set_pair_keys, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='chat',
+            constraint=models.UniqueConstraint(fields=('pair_key',), name='unique_private_chat_pair'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_chat_pair_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='messages',
+            name='time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import uuid
 from django.db import models
-from django.contrib.auth.hashers import make_password, check_password
+from django.utils import timezone
+
+from . import passwords
 
 
 class User(models.Model):
@@ -10,10 +12,33 @@ class User(models.Model):
     password = models.CharField(max_length=128)
 
     def set_password(self, raw_password):
-        self.password = make_password(raw_password)
+        passwords.set_password(self, raw_password)
 
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        return passwords.check_password(self, raw_password)
+
+    def __str__(self):
+        return self.name
+
+
+def split_skills(skills):
+    """Clean a comma-separated string (or list) of skills, dropping blanks and duplicates."""
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    names, seen = [], set()
+    for name in skills or []:
+        name = str(name).strip()[:100]
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+class Skill(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    # Lower-cased name; what ?skill= filters match against
+    slug = models.CharField(max_length=100, unique=True)
 
     def __str__(self):
         return self.name
@@ -24,7 +49,7 @@ class Profile(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="profiles")
     
     profession = models.CharField(max_length=100)
-    skills = models.TextField(help_text="Comma-separated list of skills")
+    skills = models.ManyToManyField(Skill, through="ProfileSkill", related_name="profiles", blank=True)
 
     company = models.CharField(max_length=100, blank=True, null=True)
     website = models.URLField(blank=True, null=True)
@@ -42,13 +67,44 @@ class Profile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # GET /profile pages newest-first on (created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="api_profile_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.name}'s Profile"
 
+    def set_skills(self, skills):
+        names = split_skills(skills)
+        Skill.objects.bulk_create(
+            [Skill(name=name, slug=name.lower()) for name in names], ignore_conflicts=True
+        )
+        ids = dict(Skill.objects.filter(slug__in=[n.lower() for n in names]).values_list('slug', 'id'))
+        ProfileSkill.objects.filter(profile=self).delete()
+        ProfileSkill.objects.bulk_create(
+            ProfileSkill(profile=self, skill_id=ids[name.lower()], position=i)
+            for i, name in enumerate(names)
+        )
+
+
+class ProfileSkill(models.Model):
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="profile_skills")
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name="profile_skills")
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Leading on skill, so skill filters are index lookups
+            models.UniqueConstraint(fields=["skill", "profile"], name="unique_profile_skill"),
+        ]
+
 
 class Experience(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="experiences")
+    # Indexed through api_experience_prof_from_idx
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="experiences", db_index=False)
     title = models.CharField(max_length=150)
     company = models.CharField(max_length=150)
     location = models.CharField(max_length=150, blank=True, null=True)
@@ -58,13 +114,19 @@ class Experience(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "-from_date"], name="api_experience_prof_from_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} at {self.company}"
 
 
 class Education(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="educations")
+    # Indexed through api_education_prof_from_idx
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="educations", db_index=False)
     school = models.CharField(max_length=150)
     degree = models.CharField(max_length=150)
     field_of_study = models.CharField(max_length=150)
@@ -74,6 +136,11 @@ class Education(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "-from_date"], name="api_education_prof_from_idx"),
+        ]
+
     def __str__(self):
         return f"{self.school} - {self.degree}"
 
@@ -86,18 +153,38 @@ class Post(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField(User, related_name="liked_posts", blank=True)
 
+    # Denormalized counters, kept in step by the views with F() updates.
+    # `manage.py check_post_counters --fix` repairs any drift.
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    # Bumped by every write to the post, its likes or its comments (the
+    # F() updates set it explicitly); the post's ETag is derived from it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The feed pages newest-first on (date, id)
+            models.Index(fields=["-date", "-id"], name="api_post_date_id_idx"),
+        ]
+
     def __str__(self):
         return f"Post by {self.name}"
 
 
 class Comment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
+    # Indexed through api_comment_post_date_idx
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments", db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=150)
     text = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "-date"], name="api_comment_post_date_idx"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.name}"
     
@@ -105,17 +192,82 @@ class Comment(models.Model):
 class Chat(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     type = models.CharField(max_length=50)  # 'private', 'group'
-    users_id = models.JSONField(default=list)  # List of user IDs participating in the chat
+    users = models.ManyToManyField(User, through="ChatMember", related_name="chats")
+    # "<smaller id>:<larger id>" for private chats, NULL for groups; unique,
+    # so each pair of users has at most one private chat
+    pair_key = models.CharField(max_length=73, blank=True, null=True)
+
+    # Denormalized copy of the newest message, kept in step by ChatConsumer
+    # when it stores a message, so the chat list needs no per-chat lookup.
+    # last_message_time starts at creation so empty chats still sort.
+    last_message_text = models.TextField(blank=True, null=True)
+    last_message_sender_id = models.UUIDField(blank=True, null=True)
+    last_message_time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Chat list pages most recent first on (last_message_time, id)
+            models.Index(fields=["-last_message_time", "-id"], name="api_chat_recent_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["pair_key"], name="unique_private_chat_pair"),
+        ]
 
     def __str__(self):
         return f"Chat {self.id}"
+
+    @staticmethod
+    def pair_key_for(user_a, user_b):
+        a, b = sorted((str(uuid.UUID(str(user_a))), str(uuid.UUID(str(user_b)))))
+        return f"{a}:{b}"
+
+
+class ChatMember(models.Model):
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="memberships")
+    # Indexed through unique_chat_member
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_memberships", db_index=False)
+
+    class Meta:
+        constraints = [
+            # Leading on user: a user's chats and "is this user in the chat"
+            # are both index lookups; chat_id's own index lists the members
+            models.UniqueConstraint(fields=["user", "chat"], name="unique_chat_member"),
+        ]
     
 class Messages(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="messages")
+    # Indexed through api_messages_chat_time_idx
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="messages", db_index=False)
     sender_id = models.UUIDField()
     text = models.TextField()
-    time = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so ChatConsumer can stamp the
+    # message and its chat's last_message_time with the same value
+    time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # A chat's history newest-first, and its last message
+            models.Index(fields=["chat", "-time", "-id"], name="api_messages_chat_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"Message {self.id} in Chat {self.chat.id}"
+
+class AccountDeletionJob(models.Model):
+    """
+    A deletion queued with ``DELETE /profile/<id>?background=1``. Kept in the
+    database so any worker can answer the status poll, not just the one
+    running the job.
+    """
+
+    STATUSES = [(s, s) for s in ("queued", "running", "done", "not_found", "failed")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Plain ids, not foreign keys: the job outlives the account it deletes
+    user_id = models.UUIDField()
+    requested_by = models.UUIDField()
+    status = models.CharField(max_length=16, choices=STATUSES, default="queued")
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Message {self.id} in Chat {self.chat.id}"
\ No newline at end of file
+        return f"Deletion of {self.user_id}: {self.status}"
@@ -0,0 +1,109 @@
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("limit must be an integer")
+    if limit < 1:
+        raise InvalidCursor("limit must be positive")
+    return min(limit, maximum)
+
+
+def encode_cursor(date, pk):
+    raw = f"{date.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date, pk = raw.split('|', 1)
+        return datetime.fromisoformat(date), uuid.UUID(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _keyset_slice(queryset, cursor, limit, field):
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        )
+    return queryset[:limit + 1]
+
+
+def _finish_page(rows, limit, field):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last[field], last['id'])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.id)
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor, limit, field='date'):
+    """
+    Newest-first page of ``queryset`` ordered by ``(field, id)``.
+
+    Returns ``(rows, next_cursor)``. One extra row is fetched to know
+    whether another page exists, so no COUNT query is needed.
+    """
+    rows = list(_keyset_slice(queryset, cursor, limit, field))
+    return _finish_page(rows, limit, field)
+
+
+async def akeyset_page(queryset, cursor, limit, field='date'):
+    rows = [row async for row in _keyset_slice(queryset, cursor, limit, field)]
+    return _finish_page(rows, limit, field)
+
+
+def keyset_window(queryset, limit, before=None, after=None, field='date'):
+    """
+    Up to ``limit`` rows of ``queryset``, newest-first on ``(field, id)``:
+    the newest rows, those older than the ``before`` cursor, or those just
+    newer than the ``after`` cursor.
+
+    Returns ``(rows, has_more)``, where ``has_more`` says whether further
+    rows exist in the direction being read (older, or newer for ``after``).
+    """
+    if before and after:
+        raise InvalidCursor("Pass either before or after, not both")
+    if after:
+        value, pk = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+        ).order_by(field, 'id')
+    else:
+        queryset = queryset.order_by(f'-{field}', '-id')
+        if before:
+            value, pk = decode_cursor(before)
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            )
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after:
+        rows.reverse()
+    return rows, has_more
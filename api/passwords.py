@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2-SHA256 hasher with the iteration count taken from
+    ``PASSWORD_PBKDF2_ITERATIONS``. The algorithm name is unchanged, so
+    existing hashes keep verifying and are upgraded or downgraded to the
+    configured cost on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or hashers.PBKDF2PasswordHasher.iterations
+
+
+class HashingBusy(Exception):
+    """More password hashes are waiting than ``PASSWORD_HASH_MAX_PENDING`` allows."""
+
+
+# hashlib's PBKDF2 releases the GIL, so a small pool runs hashes in parallel
+# while capping how many cores a login storm can take
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 4),
+    thread_name_prefix="password-hash",
+)
+_pending = threading.BoundedSemaphore(getattr(settings, 'PASSWORD_HASH_MAX_PENDING', 64))
+
+
+def _submit(fn, *args):
+    if not _pending.acquire(blocking=False):
+        raise HashingBusy()
+    future = _executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def _verify(raw_password, encoded):
+    # Returns (valid, new_encoded); new_encoded is set when the stored hash
+    # does not match the configured hasher profile and should be replaced
+    upgraded = []
+    valid = hashers.check_password(
+        raw_password, encoded, setter=lambda raw: upgraded.append(hashers.make_password(raw))
+    )
+    return valid, (upgraded[0] if upgraded else None)
+
+
+def _save_upgraded(user, new_encoded):
+    if new_encoded is None:
+        return
+    user.password = new_encoded
+    type(user).objects.filter(id=user.id).update(password=new_encoded)
+
+
+def set_password(user, raw_password):
+    user.password = _submit(hashers.make_password, raw_password).result()
+
+
+def check_password(user, raw_password):
+    """Verify ``raw_password`` against ``user`` in the hashing pool, rehashing it if needed."""
+    valid, new_encoded = _submit(_verify, raw_password, user.password).result()
+    if valid:
+        _save_upgraded(user, new_encoded)
+    return valid
+
@@ -0,0 +1,31 @@
+from rest_framework import permissions
+from rest_framework.exceptions import NotAuthenticated, NotFound
+
+from .authentication import USER_NOT_FOUND
+
+
+def _deny(request):
+    # DRF's own 401 drops the permission message; raise it with the reason
+    # the views used to report ("Token missing", "Token expired", ...)
+    error = getattr(request, 'auth_error', None)
+    if error == USER_NOT_FOUND:
+        raise NotFound(error)
+    raise NotAuthenticated(error or "Token missing")
+
+
+class IsAuthenticated(permissions.IsAuthenticated):
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) or _deny(request)
+
+
+class IsAuthenticatedOrReadOnly(permissions.IsAuthenticatedOrReadOnly):
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) or _deny(request)
+
+
+class IsAuthenticatedOrDeleted(permissions.BasePermission):
+    """Authenticated, or holding a valid token for a user deleted since."""
+
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated or getattr(request, 'deleted_user_id', None) is not None
+                or _deny(request))
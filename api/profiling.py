@@ -0,0 +1,165 @@
+"""
+Opt-in cProfile sampling of production requests.
+
+``ProfilingMiddleware`` profiles one request in ``PROFILE_SAMPLE_RATE``
+(0 = never) and any request sending ``X-Profile: <PROFILE_TOKEN>``. The
+slowest functions of each profiled request are kept in a bounded ring per
+URL name and served by ``/profiling`` to callers presenting the same token.
+With neither setting configured the middleware removes itself at startup,
+so it costs nothing.
+
+Under ASGI unsampled requests pass straight through. A sampled one is
+profiled on the event loop thread, so its profile also holds whatever
+else the loop ran meanwhile and, before Python 3.12, misses the work a
+view hands to ``sync_to_async`` threads.
+"""
+import cProfile
+import hmac
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, JsonResponse
+
+
+class ProfileStore:
+    """The last ``size`` profiles for each URL name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rings = {}
+
+    def add(self, route, entry):
+        size = getattr(settings, 'PROFILE_RING_SIZE', 20)
+        with self._lock:
+            ring = self._rings.get(route)
+            if ring is None or ring.maxlen != size:
+                ring = self._rings[route] = deque(ring or (), maxlen=size)
+            ring.append(entry)
+
+    def snapshot(self, route=None):
+        with self._lock:
+            if route is not None:
+                return {route: list(self._rings.get(route, ()))}
+            return {name: list(ring) for name, ring in self._rings.items()}
+
+    def clear(self):
+        with self._lock:
+            self._rings.clear()
+
+
+store = ProfileStore()
+
+
+def _token():
+    return getattr(settings, 'PROFILE_TOKEN', None)
+
+
+def _authorized(request, header):
+    token = _token()
+    supplied = request.headers.get(header)
+    return bool(token and supplied and hmac.compare_digest(supplied, token))
+
+
+def _label(func):
+    filename, line, name = func
+    return f"{filename}:{line}({name})" if line else name
+
+
+def summarize(profiler, limit):
+    """The ``limit`` functions with the most cumulative time, each with its main callers."""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for func, (cc, nc, tottime, cumtime, callers) in stats.stats.items():
+        rows.append((cumtime, func, nc, tottime, callers))
+    rows.sort(key=lambda row: row[0], reverse=True)
+
+    top = []
+    for cumtime, func, ncalls, tottime, callers in rows[:limit]:
+        main_callers = sorted(callers.items(), key=lambda item: item[1][3], reverse=True)[:3]
+        top.append({
+            "function": _label(func),
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+            "callers": [_label(caller) for caller, _ in main_callers],
+        })
+    return top
+
+
+def _start_profiler():
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per process
+        return None
+    return profiler
+
+
+def _record(request, response, profiler, elapsed):
+    match = getattr(request, 'resolver_match', None)
+    store.add(match.url_name if match is not None and match.url_name else 'unmatched', {
+        "at": time.time(),
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 3),
+        "top": summarize(profiler, getattr(settings, 'PROFILE_TOP_N', 25)),
+    })
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        if not self.rate and not _token():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self, request):
+        if self.rate and random.randrange(self.rate) == 0:
+            return True
+        return _authorized(request, 'X-Profile')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = _start_profiler() if self._sampled(request) else None
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        _record(request, response, profiler, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        profiler = _start_profiler() if self._sampled(request) else None
+        if profiler is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        _record(request, response, profiler, time.perf_counter() - started)
+        return response
+
+
+def profiles_view(request):
+    # Hidden unless a token is configured and presented
+    if not _authorized(request, 'X-Profile-Token'):
+        raise Http404()
+    return JsonResponse(store.snapshot(request.GET.get('route') or None))
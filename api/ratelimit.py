@@ -0,0 +1,275 @@
+"""
+Token-bucket rate limiting for expensive endpoints and WebSocket actions.
+
+Limits are configured per scope in ``RATE_LIMITS`` as ``"<requests>/<period>"``
+(``"10/min"``, ``"30/10s"``): the bucket holds that many tokens and refills at
+that rate. Scopes are endpoint names (``"login"``, ``"openai"``) and
+``"ws:<action>"`` for ``ChatConsumer`` actions, with ``"ws"`` as the fallback
+for actions that have no limit of their own. Buckets are per user when the
+caller is authenticated and per IP otherwise.
+
+``RATE_LIMIT_BACKEND`` is ``"local"`` (per process) or ``"redis"`` (shared,
+using ``REDIS_URL``). Checks never touch the database, and a Redis failure
+lets the request through rather than taking the endpoint down.
+"""
+import asyncio
+import functools
+import logging
+import math
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.request import Request
+
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+)\s*$')
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``"30/10s"`` -> ``(30, 3.0)``: bucket capacity and tokens refilled per second."""
+    match = _RATE_RE.match(rate or '')
+    if not match or match.group(3) not in _PERIODS:
+        raise ValueError(f"Invalid rate: {rate!r}")
+    capacity = int(match.group(1))
+    period = int(match.group(2) or 1) * _PERIODS[match.group(3)]
+    return capacity, capacity / period
+
+
+class RateLimitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, scope, allowed):
+        with self._lock:
+            counts = self._counts.setdefault(scope, [0, 0])
+            counts[0 if allowed else 1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {scope: {"allowed": a, "rejected": r} for scope, (a, r) in self._counts.items()}
+
+
+stats = RateLimitStats()
+
+
+class LocalBackend:
+    """Buckets in this process, bounded to ``max_keys`` (least recently used dropped first)."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after == 0, retry_after
+
+    async def atake(self, key, capacity, rate):
+        return self.take(key, capacity, rate)
+
+
+# Refill and take one token atomically, timed by the Redis server's clock
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    """Buckets shared by every worker, stored as small hashes under ``ratelimit:``."""
+
+    def __init__(self, url):
+        import redis
+
+        self._script = redis.Redis.from_url(url).register_script(_TOKEN_BUCKET_LUA)
+        self._url = url
+        self._async_scripts = weakref.WeakKeyDictionary()
+
+    def _async_script(self):
+        # redis.asyncio connections belong to the loop that opened them
+        import redis.asyncio
+
+        loop = asyncio.get_running_loop()
+        script = self._async_scripts.get(loop)
+        if script is None:
+            script = redis.asyncio.Redis.from_url(self._url).register_script(_TOKEN_BUCKET_LUA)
+            self._async_scripts[loop] = script
+        return script
+
+    def _result(self, retry_after):
+        retry_after = float(retry_after)
+        return retry_after == 0, retry_after
+
+    def take(self, key, capacity, rate):
+        return self._result(self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate]))
+
+    async def atake(self, key, capacity, rate):
+        return self._result(await self._async_script()(keys=[f"ratelimit:{key}"], args=[capacity, rate]))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if getattr(settings, 'RATE_LIMIT_BACKEND', 'local') == 'redis':
+                    _backend = RedisBackend(os.getenv("REDIS_URL"))
+                else:
+                    _backend = LocalBackend()
+    return _backend
+
+
+def _limit(scope):
+    limits = getattr(settings, 'RATE_LIMITS', {})
+    rate = limits.get(scope)
+    if rate is None and scope.startswith('ws:'):
+        rate = limits.get('ws')
+    return parse_rate(rate) if rate else None
+
+
+def check(scope, ident):
+    """
+    Take a token from ``scope``'s bucket for ``ident``. Returns
+    ``(allowed, retry_after_seconds)``; scopes without a limit always pass.
+    """
+    limit = _limit(scope)
+    if limit is None:
+        return True, 0
+    try:
+        allowed, retry_after = get_backend().take(f"{scope}:{ident}", *limit)
+    except Exception:
+        logger.exception("Rate limit check failed for %s", scope)
+        return True, 0
+    stats.record(scope, allowed)
+    return allowed, retry_after
+
+
+async def acheck(scope, ident):
+    limit = _limit(scope)
+    if limit is None:
+        return True, 0
+    try:
+        allowed, retry_after = await get_backend().atake(f"{scope}:{ident}", *limit)
+    except Exception:
+        logger.exception("Rate limit check failed for %s", scope)
+        return True, 0
+    stats.record(scope, allowed)
+    return allowed, retry_after
+
+
+def client_ip(meta):
+    """
+    The caller's address. With ``RATE_LIMIT_PROXY_COUNT`` proxies in front
+    (e.g. the hosting platform's load balancer), the address they appended
+    to X-Forwarded-For is used instead of the proxy's own.
+    """
+    proxies = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    forwarded = meta.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[max(len(hops) - proxies, 0)]
+    return meta.get('REMOTE_ADDR', '')
+
+
+def _token_user_id(request):
+    # Plain Django views: identify x-auth-token callers the way the DRF views
+    # do. request.user there is the session user, not the token's.
+    from .authentication import JWTAuthentication
+
+    authenticated = JWTAuthentication().authenticate(request)
+    return authenticated[0].id if authenticated else None
+
+
+def request_ident(request):
+    if isinstance(request, Request):
+        user_id = request.user.id if request.user.is_authenticated else None
+    else:
+        user_id = _token_user_id(request)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{client_ip(request.META)}"
+
+
+async def arequest_ident(request):
+    user_id = None
+    if 'x-auth-token' in request.headers:
+        # A token seen for the first time costs a query; run it off the loop
+        user_id = await sync_to_async(_token_user_id)(request)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{client_ip(request.META)}"
+
+
+def _rejected(retry_after):
+    return JsonResponse(
+        {"error": "Too many requests, try again later"},
+        status=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def rate_limit(scope):
+    """
+    Decorate a view (sync, DRF or async) so callers over ``scope``'s limit
+    get a 429 with Retry-After before the view runs.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                allowed, retry_after = await acheck(scope, await arequest_ident(request))
+                if not allowed:
+                    return _rejected(retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapped(request, *args, **kwargs):
+                allowed, retry_after = check(scope, request_ident(request))
+                if not allowed:
+                    return _rejected(retry_after)
+                return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
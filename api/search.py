@@ -0,0 +1,60 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import BooleanField, Case, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Length, Upper
+
+from .models import User
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Below this length trigrams carry too little signal; only substring matches count
+FUZZY_MIN_LENGTH = 3
+
+
+class TrigramMatch(Func):
+    # pg_trgm's ``%`` operator; served by the GIN index on UPPER(name)
+    arg_joiner = ' %% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+def _search_queryset(query, limit):
+    users = User.objects.annotate(
+        prefix=Case(When(name__istartswith=query, then=Value(0)), default=Value(1), output_field=IntegerField()),
+    )
+
+    if connection.vendor == 'postgresql':
+        match = Q(name__icontains=query)
+        if len(query) >= FUZZY_MIN_LENGTH:
+            match |= Q(TrigramMatch(Upper('name'), Value(query.upper())))
+        users = (
+            users.filter(match)
+            .annotate(similarity=TrigramSimilarity(Upper('name'), query.upper()))
+            .order_by('prefix', '-similarity', 'name')
+        )
+    else:
+        # SQLite (tests, local dev): substring match ranked by prefix, then length
+        users = users.filter(name__icontains=query).order_by('prefix', Length('name'), 'name')
+
+    return users.values('id', 'name')[:limit]
+
+
+def search_users(query, limit=DEFAULT_LIMIT):
+    """
+    Users whose name matches ``query``, best match first: prefix matches,
+    then (on PostgreSQL) by trigram similarity, then by name. At most
+    ``limit`` rows are read.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    return list(_search_queryset(query, limit))
+
+
+async def asearch_users(query, limit=DEFAULT_LIMIT):
+    query = query.strip()
+    if not query:
+        return []
+    return [row async for row in _search_queryset(query, limit)]
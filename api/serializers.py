@@ -0,0 +1,179 @@
+"""
+Plain-dict serialization for profile payloads.
+
+Rows are fetched with ``values()`` / ``values_list()`` so no model
+instances are built. UUIDs and dates are left as-is; the JSON renderer
+(``api.renderers.ORJSONRenderer``) encodes them natively.
+"""
+from .models import Education, Experience, Profile, ProfileSkill
+
+
+PROFILE_FIELDS = (
+    'id', 'user_id', 'user__name', 'profession', 'company', 'location', 'bio',
+    'facebook', 'instagram', 'linkedin', 'twitter', 'youtube',
+)
+
+PROFILE_SUMMARY_FIELDS = ('id', 'created_at', 'user_id', 'user__name', 'profession', 'company', 'location')
+
+EXPERIENCE_COLUMNS = ('id', 'company', 'from_date', 'title', 'location', 'description')
+
+EDUCATION_COLUMNS = ('id', 'school', 'field_of_study', 'description', 'degree', 'from_date')
+
+
+def _group(profile_ids, rows, doc=None):
+    grouped = {pk: [] for pk in profile_ids}
+    for profile_id, *row in rows:
+        grouped[profile_id].append(doc(*row) if doc else row[0])
+    return grouped
+
+
+def _skill_rows(profile_ids):
+    return (
+        ProfileSkill.objects.filter(profile_id__in=profile_ids)
+        .order_by('position').values_list('profile_id', 'skill__name')
+    )
+
+
+def skills_by_profile(profile_ids):
+    """``{profile_id: [skill names in entry order]}`` in one query."""
+    return _group(profile_ids, _skill_rows(profile_ids))
+
+
+def _experience_doc(pk, company, from_date, title, location, description):
+    return {
+        "_id": pk,
+        "company": company,
+        "from": from_date,
+        "title": title,
+        "location": location or "",
+        "description": description or "",
+    }
+
+
+def _education_doc(pk, school, field_of_study, description, degree, from_date):
+    return {
+        "_id": pk,
+        "school": school,
+        "fieldofstudy": field_of_study,
+        "description": description or "",
+        "degree": degree,
+        "from": from_date,
+    }
+
+
+def _experience_rows(profile_ids):
+    return (
+        Experience.objects.filter(profile_id__in=profile_ids)
+        .order_by('-from_date').values_list('profile_id', *EXPERIENCE_COLUMNS)
+    )
+
+
+def _education_rows(profile_ids):
+    return (
+        Education.objects.filter(profile_id__in=profile_ids)
+        .order_by('-from_date').values_list('profile_id', *EDUCATION_COLUMNS)
+    )
+
+
+def experiences_by_profile(profile_ids):
+    return _group(profile_ids, _experience_rows(profile_ids), _experience_doc)
+
+
+def educations_by_profile(profile_ids):
+    return _group(profile_ids, _education_rows(profile_ids), _education_doc)
+
+
+def experiences(profile_id):
+    return experiences_by_profile([profile_id])[profile_id]
+
+
+def educations(profile_id):
+    return educations_by_profile([profile_id])[profile_id]
+
+
+def profile_summary(p, skills):
+    return {
+        "user": {
+            "_id": p['user_id'],
+            "name": p['user__name'],
+            # Placeholder avatar; frontend expects this key
+            "avatar": "",
+        },
+        "status": p['profession'],
+        "company": p['company'] or "",
+        "location": p['location'] or "",
+        "skills": skills,
+    }
+
+
+def profile_document(p, skills, experience, education):
+    return {
+        "user": {
+            "_id": p['user_id'],
+            "name": p['user__name'],
+            "avatar": "",
+        },
+        "status": p['profession'],
+        "company": p['company'] or "",
+        "location": p['location'] or "",
+        "bio": p['bio'] or "",
+        "skills": skills,
+        "social": {
+            "facebook": p['facebook'] or "",
+            "instagram": p['instagram'] or "",
+            "linkedin": p['linkedin'] or "",
+            "twitter": p['twitter'] or "",
+            "youtube": p['youtube'] or "",
+        },
+        "experience": experience,
+        "education": education,
+    }
+
+
+def load_profile_document(user_id):
+    """Full profile document for ``user_id`` in four queries, or ``None``."""
+    p = Profile.objects.filter(user_id=user_id).values(*PROFILE_FIELDS).first()
+    if p is None:
+        return None
+    skills = skills_by_profile([p['id']])[p['id']]
+    return profile_document(p, skills, experiences(p['id']), educations(p['id']))
+
+
+def load_profile_documents(user_ids, full=False):
+    """
+    ``{user_id: document}`` for the users in ``user_ids`` that have a
+    profile. Summaries take two queries, full documents four, however
+    many users are asked for.
+    """
+    fields = PROFILE_FIELDS if full else PROFILE_SUMMARY_FIELDS
+    rows = list(Profile.objects.filter(user_id__in=user_ids).values(*fields))
+    profile_ids = [p['id'] for p in rows]
+    skills = skills_by_profile(profile_ids)
+
+    if not full:
+        return {p['user_id']: profile_summary(p, skills[p['id']]) for p in rows}
+
+    exp = experiences_by_profile(profile_ids)
+    edu = educations_by_profile(profile_ids)
+    return {
+        p['user_id']: profile_document(p, skills[p['id']], exp[p['id']], edu[p['id']])
+        for p in rows
+    }
+
+
+# Async counterparts for the ASGI read views (api/async_views.py). Same
+# queries, run through Django's async ORM.
+
+async def askills_by_profile(profile_ids):
+    return _group(profile_ids, [row async for row in _skill_rows(profile_ids)])
+
+
+async def aload_profile_document(user_id):
+    p = await Profile.objects.filter(user_id=user_id).values(*PROFILE_FIELDS).afirst()
+    if p is None:
+        return None
+    ids = [p['id']]
+    skills = await askills_by_profile(ids)
+    experience = _group(ids, [row async for row in _experience_rows(ids)], _experience_doc)
+    education = _group(ids, [row async for row in _education_rows(ids)], _education_doc)
+    return profile_document(p, skills[p['id']], experience[p['id']], education[p['id']])
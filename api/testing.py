@@ -0,0 +1,121 @@
+"""
+Shared helpers for the query-budget tests in ``api/tests.py`` and
+``chat/tests.py``.
+
+``QueryBudgetMixin.query_budget`` fails a test when a block issues more
+queries than its budget and records the observed count; ``aquery_budget``
+does the same around async code such as a ``WebsocketCommunicator``. The
+counts are printed after each test module and, when ``QUERY_REPORT_FILE``
+is set, merged into that JSON file so CI can keep them as an artifact.
+"""
+import datetime
+import json
+import os
+import sys
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from .models import Comment, Education, Experience, Post, Profile, User
+
+
+QUERY_REPORT = {}
+
+
+def _start_capture():
+    # Runs in the thread that database_sync_to_async work is sent to, so the
+    # captured connection is the one the consumer's queries go through
+    ctx = CaptureQueriesContext(connections[DEFAULT_DB_ALIAS])
+    ctx.__enter__()
+    return ctx
+
+
+class QueryBudgetMixin:
+    def _check_budget(self, label, budget, ctx):
+        QUERY_REPORT[label] = {"queries": len(ctx), "budget": budget}
+        if len(ctx) > budget:
+            sql = '\n'.join(f"  {q['sql']}" for q in ctx.captured_queries)
+            self.fail(f"{label}: {len(ctx)} queries, budget is {budget}\n{sql}")
+
+    @contextmanager
+    def query_budget(self, label, budget):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        self._check_budget(label, budget, ctx)
+
+    @asynccontextmanager
+    async def aquery_budget(self, label, budget):
+        ctx = await sync_to_async(_start_capture)()
+        try:
+            yield ctx
+        finally:
+            await sync_to_async(ctx.__exit__)(None, None, None)
+        self._check_budget(label, budget, ctx)
+
+
+def write_report():
+    if not QUERY_REPORT:
+        return
+    width = max(len(label) for label in QUERY_REPORT)
+    lines = [f"\nQuery budgets ({len(QUERY_REPORT)} checks)"]
+    for label, entry in sorted(QUERY_REPORT.items()):
+        lines.append(f"  {label:{width}}  {entry['queries']:3} / {entry['budget']}")
+    sys.stderr.write('\n'.join(lines) + '\n')
+
+    path = os.getenv('QUERY_REPORT_FILE')
+    if path:
+        report = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                report = json.load(f)
+        report.update(QUERY_REPORT)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    QUERY_REPORT.clear()
+
+
+def seed_network(users=12, posts=40, likes_per_post=6, comments_per_post=3, password="secret123"):
+    """
+    Users with full profiles, and posts with likes and comments spread
+    across them. Returns the users; every one can log in with ``password``.
+    """
+    encoded = make_password(password)
+    people = User.objects.bulk_create([
+        User(name=f"user{i:02}", email=f"user{i:02}@example.com", password=encoded)
+        for i in range(users)
+    ])
+
+    profiles = Profile.objects.bulk_create([
+        Profile(user=u, profession="Developer", company=f"Company {i}", location="Remote", bio="Bio")
+        for i, u in enumerate(people)
+    ])
+    for i, profile in enumerate(profiles):
+        profile.set_skills(["Python", "Django", "Go" if i % 2 else "Rust"])
+    start = datetime.date(2015, 1, 1)
+    Experience.objects.bulk_create([
+        Experience(profile=p, title=f"Engineer {n}", company="Acme", from_date=start + datetime.timedelta(days=400 * n))
+        for p in profiles for n in range(2)
+    ])
+    Education.objects.bulk_create([
+        Education(profile=p, school=f"School {n}", degree="BSc", field_of_study="CS",
+                  from_date=start - datetime.timedelta(days=1500 * (n + 1)))
+        for p in profiles for n in range(2)
+    ])
+
+    feed = Post.objects.bulk_create([
+        Post(user=people[i % users], name=people[i % users].name, text=f"Post {i}",
+             likes_count=likes_per_post, comments_count=comments_per_post)
+        for i in range(posts)
+    ])
+    Post.likes.through.objects.bulk_create([
+        Post.likes.through(post_id=post.id, user_id=people[(i + n) % users].id)
+        for i, post in enumerate(feed) for n in range(likes_per_post)
+    ])
+    Comment.objects.bulk_create([
+        Comment(post=post, user=people[(i + n) % users], name=people[(i + n) % users].name, text=f"Comment {n}")
+        for i, post in enumerate(feed) for n in range(comments_per_post)
+    ])
+    return people
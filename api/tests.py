@@ -1,3 +1,590 @@
-from django.test import TestCase
+import json
+import types
+import uuid
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import AsyncClient, Client, TestCase, override_settings
+
+from DevConnector_back import urls
+
+from . import accounts
+from . import assistant
+from . import async_views
+from . import authentication
+from . import cache as posts_cache
+from . import metrics
+from . import profiling
+from . import ratelimit
+from . import views
+from .authentication import create_token, token_cache
+from .models import Comment, Education, Experience, Post, Profile, User
+from .testing import QueryBudgetMixin, seed_network, write_report
+
+
+def tearDownModule():
+    write_report()
+
+
+@override_settings(RATE_LIMITS={}, PASSWORD_PBKDF2_ITERATIONS=1000)
+class APITestCase(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_network()
+        cls.me = cls.users[0]
+        cls.other = cls.users[1]
+
+    def setUp(self):
+        # Budgets are for the cold path: no cached pages or token lookups
+        cache.clear()
+        token_cache.clear()
+        self.auth = {'HTTP_X_AUTH_TOKEN': create_token(self.me.id)}
+
+    def stream(self, response):
+        return b''.join(response.streaming_content)
+
+
+class AuthTests(APITestCase):
+    def test_register(self):
+        with self.query_budget("register", 2):
+            response = self.client.post('/register/', {'name': 'new', 'email': 'new@example.com', 'password': 'pw123456'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+
+    def test_login(self):
+        with self.query_budget("login", 1):
+            response = self.client.post('/login/', {'email': self.me.email, 'password': 'secret123'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_rehashes_to_configured_cost(self):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            with self.query_budget("login (rehash)", 2):
+                response = self.client.post('/login/', {'email': self.me.email, 'password': 'secret123'},
+                                            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(id=self.me.id).password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_missing_and_bad_tokens(self):
+        response = self.client.post('/posts', {'text': 'x'}, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()), (401, {"error": "Token missing"}))
+        response = self.client.post('/posts', {'text': 'x'}, content_type='application/json', HTTP_X_AUTH_TOKEN='junk')
+        self.assertEqual((response.status_code, response.json()), (401, {"error": "Invalid token"}))
+
+    def test_token_checked_once_then_cached(self):
+        self.client.get('/profile/me', **self.auth)
+        # Only the profile queries: the token and its user are cached
+        with self.query_budget("get_profile_me (cached token)", 5):
+            self.client.get('/profile/me', **self.auth)
+
+    def test_user_change_rechecks_cached_tokens(self):
+        self.client.get('/profile/me', **self.auth)
+        # A save drops this process's entries, and the shared version on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.me.save()
+        self.assertIsNone(token_cache.get(self.auth['HTTP_X_AUTH_TOKEN']))
+        self.assertIsNone(cache.get(authentication._user_version_key(self.me.id)))
+
+        # A change made by another worker only moves the shared version
+        self.client.get('/profile/me', **self.auth)
+        cache.delete(authentication._user_version_key(self.me.id))
+        with self.query_budget("get_profile_me (user changed elsewhere)", 6):
+            response = self.client.get('/profile/me', **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_of_deleted_user(self):
+        gone = User.objects.create(name='gone', email='gone@example.com', password='x')
+        auth = {'HTTP_X_AUTH_TOKEN': create_token(gone.id)}
+        self.client.get('/posts', **auth)
+        gone.delete()
+        post = Post.objects.first()
+        for _ in range(2):
+            response = self.client.put(f'/posts/like/{post.id}', **auth)
+            self.assertEqual((response.status_code, response.json()), (404, {"error": "User not found"}))
+        # Public reads ignore the stale token
+        self.assertEqual(self.client.get('/posts', **auth).status_code, 200)
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=1)
+    def test_client_ip_behind_proxy(self):
+        # The platform's proxy appends the address it saw; anything before it is client-supplied
+        meta = {'REMOTE_ADDR': '10.0.0.1', 'HTTP_X_FORWARDED_FOR': '6.6.6.6, 203.0.113.7'}
+        self.assertEqual(ratelimit.client_ip(meta), '203.0.113.7')
+
+    @override_settings(RATE_LIMITS={"login": "2/min"})
+    def test_rate_limited_login_skips_database(self):
+        for _ in range(2):
+            self.client.post('/login/', {'email': self.me.email, 'password': 'wrong'}, content_type='application/json')
+        with self.query_budget("login (rate limited)", 0):
+            response = self.client.post('/login/', {'email': self.me.email, 'password': 'wrong'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+class ProfileTests(APITestCase):
+    def test_create_profile(self):
+        Profile.objects.filter(user=self.me).delete()
+        with self.query_budget("create_profile", 13):
+            response = self.client.post('/create-profile/', {'status': 'Dev', 'skills': 'python, go, sql'},
+                                        content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_list_profiles_streamed(self):
+        with self.query_budget("list_profiles (stream)", 2):
+            body = self.stream(self.client.get('/profile'))
+        self.assertEqual(body.count(b'"status"'), len(self.users))
+
+    async def test_list_profiles_streams_under_asgi(self):
+        # Under ASGI the chunks must reach the server one by one, not as a
+        # sync iterator Django would buffer whole
+        with mock.patch.object(views, 'PROFILE_STREAM_CHUNK', 5):
+            response = await self.async_client.get('/profile')
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(len(json.loads(b''.join(chunks))), len(self.users))
+
+    def test_list_profiles_paged(self):
+        with self.query_budget("list_profiles (page)", 2):
+            response = self.client.get('/profile', {'limit': 5})
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertIsNotNone(response.json()['next'])
+
+    def test_list_profiles_by_skill(self):
+        with self.query_budget("list_profiles (skill)", 3):
+            body = self.stream(self.client.get('/profile', {'skill': ['python', 'go']}))
+        self.assertEqual(body.count(b'"status"'), len(self.users) // 2)
+
+    def test_batch_profiles(self):
+        ids = ','.join(str(u.id) for u in self.users)
+        with self.query_budget("batch_profiles", 2):
+            response = self.client.get('/profile/batch', {'ids': ids})
+        self.assertEqual(len(response.json()['results']), len(self.users))
+        with self.query_budget("batch_profiles (full)", 4):
+            response = self.client.get('/profile/batch', {'ids': ids, 'full': '1'})
+        self.assertEqual(len(response.json()['results'][0]['experience']), 2)
+
+    def test_get_profile_by_user(self):
+        with self.query_budget("get_profile_by_user", 5):
+            response = self.client.get(f'/profile/user/{self.other.id}')
+        self.assertEqual(response.json()['user']['name'], self.other.name)
+        with self.query_budget("get_profile_by_user (304)", 1):
+            response = self.client.get(f'/profile/user/{self.other.id}', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_profile_me(self):
+        with self.query_budget("get_profile_me", 6):
+            response = self.client.get('/profile/me', **self.auth)
+        self.assertEqual(response.json()['user']['name'], self.me.name)
+
+    def test_search(self):
+        with self.query_budget("search_profile_by_username", 1):
+            response = self.client.get('/search/', {'q': 'user0'})
+        self.assertEqual(response.json()[0]['name'], 'user00')
+
+    def test_add_and_delete_experience(self):
+        with self.query_budget("add_experience", 4):
+            response = self.client.put('/profile/experience', {'title': 'CTO', 'company': 'X', 'from': '2024-01-01'},
+                                       content_type='application/json', **self.auth)
+        self.assertEqual(len(response.json()['experience']), 3)
+        exp_id = Experience.objects.filter(profile__user=self.me).values_list('id', flat=True)[0]
+        with self.query_budget("delete_experience", 4):
+            response = self.client.delete(f'/profile/experience/{exp_id}', **self.auth)
+        self.assertEqual(len(response.json()['experience']), 2)
+
+    def test_add_and_delete_education(self):
+        with self.query_budget("add_education", 4):
+            response = self.client.put('/profile/education', {'school': 'MIT', 'degree': 'MSc', 'fieldofstudy': 'CS',
+                                                              'from': '2010-01-01'},
+                                       content_type='application/json', **self.auth)
+        self.assertEqual(len(response.json()['education']), 3)
+        edu_id = Education.objects.filter(profile__user=self.me).values_list('id', flat=True)[0]
+        with self.query_budget("delete_education", 4):
+            response = self.client.delete(f'/profile/education/{edu_id}', **self.auth)
+        self.assertEqual(len(response.json()['education']), 2)
+
+    def test_delete_profile(self):
+        with self.query_budget("delete_profile", 26):
+            response = self.client.delete(f'/profile/{self.me.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(id=self.me.id).exists())
+        self.assertEqual(Post.objects.filter(user=self.me).count(), 0)
+        # Counters on other users' posts the deleted user liked stay in step
+        for post in Post.objects.all():
+            self.assertEqual(post.likes_count, post.likes.count())
+            self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_delete_profile_in_background(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.query_budget("delete_profile (background)", 4):
+                response = self.client.delete(f'/profile/{self.me.id}?background=1', **self.auth)
+        self.assertEqual(response.status_code, 202)
+        job_id, status_url = response.json()['job_id'], response.json()['status_url']
+        self.assertEqual(response['Location'], status_url)
+        # Submitted to the executor once the job row is committed
+        self.assertEqual(len(callbacks), 1)
+
+        with self.query_budget("account_deletion_status", 1):
+            response = self.client.get(status_url, **self.auth)
+        self.assertEqual(response.json(), {"job_id": job_id, "status": "queued", "user_id": str(self.me.id)})
+
+        # Run here: the executor's own connection can't see this test's transaction
+        with mock.patch.object(accounts, 'close_old_connections'):
+            accounts._run_deletion_job(uuid.UUID(job_id), self.me.id)
+        self.assertFalse(User.objects.filter(id=self.me.id).exists())
+        # The caller's account is gone, but its token can still poll the job
+        response = self.client.get(status_url, **self.auth)
+        self.assertEqual((response.status_code, response.json()['status']), (200, "done"))
+
+    def test_account_deletion_status_is_the_callers_own(self):
+        response = self.client.delete(f'/profile/{self.other.id}?background=1')
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(User.objects.filter(id=self.other.id).exists())
+        response = self.client.delete(f'/profile/{uuid.uuid4()}?background=1', **self.auth)
+        self.assertEqual(response.json(), {"error": "User not found"})
+
+        status_url = f'/profile/deletion/{accounts.queue_account_deletion(self.me.id, requested_by=self.me.id)}'
+        self.assertEqual(self.client.get(status_url).status_code, 401)
+        other = {'HTTP_X_AUTH_TOKEN': create_token(self.other.id)}
+        self.assertEqual(self.client.get(status_url, **other).json(), {"error": "Job not found"})
+        self.assertEqual(self.client.get(f'/profile/deletion/{uuid.uuid4()}', **self.auth).status_code, 404)
+        self.assertEqual(self.client.get(status_url, **self.auth).json()['status'], "queued")
+
+
+class PostTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.filter(user=self.other).first()
+
+    def test_feed(self):
+        with self.query_budget("posts GET", 1):
+            response = self.client.get('/posts', {'limit': 20})
+        self.assertEqual(len(response.json()['results']), 20)
+        with self.query_budget("posts GET (cached)", 0):
+            self.client.get('/posts', {'limit': 20})
+
+    def test_create_post(self):
+        with self.query_budget("posts POST", 2):
+            response = self.client.post('/posts', {'text': 'hello'}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_post_detail(self):
+        with self.query_budget("post_detail GET", 3):
+            response = self.client.get(f'/posts/{self.post.id}')
+        self.assertEqual(len(response.json()['comments']), 3)
+        with self.query_budget("post_detail GET (cached)", 0):
+            self.client.get(f'/posts/{self.post.id}')
+
+    def test_post_etag(self):
+        Post.likes.through.objects.filter(post=self.post, user=self.me).delete()
+        etag = self.client.get(f'/posts/{self.post.id}')['ETag']
+        with self.query_budget("post_detail GET (304)", 0):
+            response = self.client.get(f'/posts/{self.post.id}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Derived from the post, not the cache: unchanged once the cache is gone
+        cache.clear()
+        self.assertEqual(self.client.get(f'/posts/{self.post.id}')['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/posts/like/{self.post.id}', **self.auth)
+        self.assertNotEqual(self.client.get(f'/posts/{self.post.id}', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_none_match_star_on_missing_post(self):
+        response = self.client.get(f'/posts/{uuid.uuid4()}', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(f'/posts/{self.post.id}', HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_unknown_post_leaves_no_version_key(self):
+        missing = uuid.uuid4()
+        response = self.client.get(f'/posts/{missing}')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(posts_cache._post_version_key(missing)))
+        self.client.get(f'/posts/{self.post.id}')
+        self.assertIsNotNone(cache.get(posts_cache._post_version_key(self.post.id)))
+
+    def test_delete_post(self):
+        own = Post.objects.filter(user=self.me).first()
+        with self.query_budget("post_detail DELETE", 5):
+            response = self.client.delete(f'/posts/{own.id}', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(f'/posts/{self.post.id}', **self.auth)
+        self.assertEqual(response.status_code, 403)
+
+    def test_like_and_unlike(self):
+        Post.likes.through.objects.filter(post=self.post, user=self.me).delete()
+        Post.objects.filter(id=self.post.id).update(likes_count=self.post.likes.count())
+        before = Post.objects.get(id=self.post.id).likes_count
+        with self.query_budget("like_post", 10):
+            response = self.client.put(f'/posts/like/{self.post.id}', **self.auth)
+        self.assertIn(str(self.me.id), response.json())
+        self.assertEqual(Post.objects.get(id=self.post.id).likes_count, before + 1)
+        with self.query_budget("unlike_post", 6):
+            response = self.client.put(f'/posts/unlike/{self.post.id}', **self.auth)
+        self.assertNotIn(str(self.me.id), response.json())
+        self.assertEqual(Post.objects.get(id=self.post.id).likes_count, before)
+        self.assertEqual(len(response.json()), before)
+
+    def test_check_post_counters(self):
+        Post.objects.filter(id=self.post.id).update(likes_count=99)
+        out = StringIO()
+        call_command('check_post_counters', stdout=out)
+        self.assertIn(f"{self.post.id}: likes 99 -> {self.post.likes.count()}", out.getvalue())
+        self.assertEqual(Post.objects.get(id=self.post.id).likes_count, 99)
+
+        call_command('check_post_counters', '--fix', stdout=out)
+        self.assertEqual(Post.objects.get(id=self.post.id).likes_count, self.post.likes.count())
+        out = StringIO()
+        call_command('check_post_counters', stdout=out)
+        self.assertIn("All post counters are correct.", out.getvalue())
+
+    def test_add_and_delete_comment(self):
+        with self.query_budget("add_comment", 6):
+            response = self.client.post(f'/posts/comment/{self.post.id}', {'text': 'nice'},
+                                        content_type='application/json', **self.auth)
+        comment_id = response.json()['_id']
+        with self.query_budget("delete_comment", 7):
+            response = self.client.delete(f'/posts/comment/{self.post.id}/{comment_id}', **self.auth)
+        self.assertEqual(len(response.json()['comments']), 3)
+        self.assertEqual(Post.objects.get(id=self.post.id).comments_count, Comment.objects.filter(post=self.post).count())
+
+
+class CacheInvalidationTests(APITestCase):
+    # TestCase only runs on_commit callbacks when asked to, so each write is
+    # captured; without that the cached pages below would never change
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.filter(user=self.other).first()
+        Post.likes.through.objects.filter(post=self.post, user=self.me).delete()
+        Post.objects.filter(id=self.post.id).update(likes_count=self.post.likes.count())
+
+    def feed_item(self, post):
+        results = self.client.get('/posts', {'limit': 100}).json()['results']
+        return next((item for item in results if item['_id'] == str(post.id)), None)
+
+    def detail(self, post):
+        return self.client.get(f'/posts/{post.id}')
+
+    def write(self, method, path, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(path, content_type='application/json', **self.auth, **extra)
+
+    def test_like_and_unlike(self):
+        likes = self.feed_item(self.post)['likes_count']
+        self.detail(self.post)
+        self.write('put', f'/posts/like/{self.post.id}')
+        self.assertEqual(self.feed_item(self.post)['likes_count'], likes + 1)
+        self.assertIn(str(self.me.id), self.detail(self.post).json()['likes'])
+        self.write('put', f'/posts/unlike/{self.post.id}')
+        self.assertEqual(self.feed_item(self.post)['likes_count'], likes)
+        self.assertNotIn(str(self.me.id), self.detail(self.post).json()['likes'])
+
+    def test_comment(self):
+        comments = self.feed_item(self.post)['comments']
+        self.detail(self.post)
+        comment_id = self.write('post', f'/posts/comment/{self.post.id}', data={'text': 'fresh'}).json()['_id']
+        self.assertEqual(self.feed_item(self.post)['comments'], comments + 1)
+        self.assertIn(comment_id, [c['_id'] for c in self.detail(self.post).json()['comments']])
+        self.write('delete', f'/posts/comment/{self.post.id}/{comment_id}')
+        self.assertEqual(self.feed_item(self.post)['comments'], comments)
+        self.assertNotIn(comment_id, [c['_id'] for c in self.detail(self.post).json()['comments']])
+
+    def test_delete(self):
+        own = Post.objects.filter(user=self.me).first()
+        self.assertIsNotNone(self.feed_item(own))
+        self.assertEqual(self.detail(own).status_code, 200)
+        self.write('delete', f'/posts/{own.id}')
+        self.assertIsNone(self.feed_item(own))
+        self.assertEqual(self.detail(own).status_code, 404)
+
+
+def _async_read_urls():
+    module = types.ModuleType('async_read_urls')
+    module.urlpatterns = urls.routes(async_views)
+    return module
+
+
+@override_settings(ROOT_URLCONF=_async_read_urls())
+class AsyncViewTests(APITestCase):
+    # The routes as served with ASYNC_READ_VIEWS on, CSRF checked as for a browser
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient(enforce_csrf_checks=True)
+
+    async def test_reads(self):
+        post = await Post.objects.filter(user=self.other).afirst()
+        response = await self.async_client.get('/posts', {'limit': 5})
+        self.assertEqual(len(response.json()['results']), 5)
+        response = await self.async_client.get(f'/posts/{post.id}')
+        self.assertEqual(response.json()['_id'], str(post.id))
+        response = await self.async_client.get(f'/profile/user/{self.other.id}')
+        self.assertEqual(response.json()['user']['name'], self.other.name)
+        response = await self.async_client.get('/search/', {'q': 'user0'})
+        self.assertEqual(response.json()[0]['name'], 'user00')
+        response = await self.async_client.get('/profile')
+        self.assertEqual(len(json.loads(b''.join([c async for c in response.streaming_content]))), len(self.users))
+
+    async def test_async_streamed_response_is_measured(self):
+        key = ('list_profiles', 'GET', '200')
+        before = metrics.http.collect().get(key, metrics._Series())
+        response = await self.async_client.get('/profile')
+        self.assertTrue(response.is_async)
+        b''.join([c async for c in response.streaming_content])
+        after = metrics.http.collect()[key]
+        self.assertEqual((after.count - before.count, after.queries - before.queries), (1, 2))
+
+    async def test_writes_are_handed_to_drf(self):
+        response = await self.async_client.post('/posts', {'text': 'hello'}, content_type='application/json',
+                                                headers={'x-auth-token': self.auth['HTTP_X_AUTH_TOKEN']})
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.delete(f'/posts/{response.json()["_id"]}',
+                                                  headers={'x-auth-token': self.auth['HTTP_X_AUTH_TOKEN']})
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.post('/posts', {'text': 'anonymous'}, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()), (401, {"error": "Token missing"}))
+
+
+@override_settings(ASSISTANT_BACKEND='api.assistant.FakeBackend', ASSISTANT_FAKE_DELAY=0)
+class AssistantTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+        self.async_client = AsyncClient(enforce_csrf_checks=True)
+
+    def ask(self, message, **headers):
+        return self.client.post('/openai/', {"message": message}, content_type='application/json', **headers)
+
+    def test_answer_then_cached(self):
+        with self.query_budget("openai", 0):
+            response = self.ask("hi")
+        self.assertEqual((response.status_code, response.json()), (200, {"response": "You said: hi"}))
+        with mock.patch.object(assistant.FakeBackend, 'stream', side_effect=AssertionError("not cached")):
+            with self.query_budget("openai (cached)", 0):
+                response = self.ask("hi")
+        self.assertEqual(response.json(), {"response": "You said: hi"})
+        # A token only costs the user lookup that keys the rate limit
+        with self.query_budget("openai (token)", 1):
+            self.assertEqual(self.ask("hello", **self.auth).status_code, 200)
+
+    async def test_stream(self):
+        response = await self.async_client.post('/openai/', {"message": "hello there", "stream": True},
+                                                content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = b''.join([chunk async for chunk in response.streaming_content]).split(b'\n\n')
+        self.assertEqual(events[:-1], [b'data: {"delta":"You"}', b'data: {"delta":" said:"}', b'data: {"delta":" hello"}',
+                                       b'data: {"delta":" there"}', b'data: [DONE]'])
+
+    @override_settings(RATE_LIMITS={"openai": "1/min"})
+    def test_rate_limited_per_token_user(self):
+        other = {'HTTP_X_AUTH_TOKEN': create_token(self.other.id)}
+        # A session cookie must not be what identifies the caller
+        self.client.cookies['sessionid'] = 'stale'
+        with mock.patch.object(ratelimit, '_backend', ratelimit.LocalBackend()):
+            self.assertEqual(self.ask("hi", **self.auth).status_code, 200)
+            self.assertEqual(self.ask("hi", **self.auth).status_code, 429)
+            self.assertEqual(self.ask("hi", **other).status_code, 200)
+
+    @override_settings(ASSISTANT_MAX_CONCURRENCY=0)
+    def test_busy(self):
+        response = self.ask("hi")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    @override_settings(ASSISTANT_TIMEOUT=0.05, ASSISTANT_FAKE_DELAY=1)
+    def test_timeout(self):
+        self.assertEqual(self.ask("hi").status_code, 504)
+
+
+class StatsTests(APITestCase):
+    def test_stats_endpoints(self):
+        with self.query_budget("cache_stats", 0):
+            self.assertEqual(self.client.get('/cache/stats').status_code, 200)
+        with self.query_budget("rate_limit_stats", 0):
+            self.assertEqual(self.client.get('/ratelimit/stats').status_code, 200)
+        with self.query_budget("metrics", 0):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_streamed_response_is_measured_until_closed(self):
+        key = ('list_profiles', 'GET', '200')
+        before = metrics.http.collect().get(key, metrics._Series())
+        response = self.client.get('/profile')
+        self.assertEqual(metrics.http.collect().get(key, metrics._Series()).count, before.count)
+        self.stream(response)
+        after = metrics.http.collect()[key]
+        self.assertEqual(after.count, before.count + 1)
+        # Both queries run while the body streams (see "list_profiles (stream)")
+        self.assertEqual(after.queries - before.queries, 2)
+        self.assertGreaterEqual(after.total - before.total, after.db_seconds - before.db_seconds)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_stats_endpoints_need_the_metrics_token(self):
+        for path in ('/cache/stats', '/ratelimit/stats', '/metrics'):
+            self.assertEqual(self.client.get(path).status_code, 401)
+            self.assertEqual(self.client.get(path, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+@override_settings(PROFILE_TOKEN='pr0file', PROFILE_SAMPLE_RATE=0)
+class ProfilingTests(APITestCase):
+    # A fresh client per test: the middleware is only installed when
+    # profiling is configured at the time the client loads it
+    def setUp(self):
+        super().setUp()
+        profiling.store.clear()
+        self.client = Client()
+
+    def profiles(self, **params):
+        response = self.client.get('/profiling', params, HTTP_X_PROFILE_TOKEN='pr0file')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_profiling_view_needs_the_token(self):
+        self.assertEqual(self.client.get('/profiling').status_code, 404)
+        self.assertEqual(self.client.get('/profiling', HTTP_X_PROFILE_TOKEN='guess').status_code, 404)
+        with self.query_budget("profiling", 0):
+            self.assertEqual(self.profiles(), {})
+        with override_settings(PROFILE_TOKEN=None):
+            self.assertEqual(self.client.get('/profiling', HTTP_X_PROFILE_TOKEN='pr0file').status_code, 404)
+
+    def test_only_requests_presenting_the_token_are_profiled(self):
+        self.client.get('/posts', {'limit': 5})
+        self.client.get('/posts', {'limit': 5}, HTTP_X_PROFILE='guess')
+        self.assertEqual(self.profiles(), {})
+        self.client.get('/posts', {'limit': 5}, HTTP_X_PROFILE='pr0file')
+        [entry] = self.profiles(route='posts')['posts']
+        self.assertEqual((entry['method'], entry['path'], entry['status']), ('GET', '/posts', 200))
+        self.assertGreater(entry['duration_ms'], 0)
+        # Readable as served: the view itself among the top functions, by cumulative time
+        self.assertTrue(any(row['function'].endswith('(posts)') for row in entry['top']))
+        cumtimes = [row['cumtime_ms'] for row in entry['top']]
+        self.assertEqual(cumtimes, sorted(cumtimes, reverse=True))
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampling(self):
+        self.client.get('/posts', {'limit': 5})
+        self.client.get(f'/profile/user/{self.other.id}')
+        self.assertEqual(set(self.profiles()), {'posts', 'get_profile_by_user'})
+
+    @override_settings(PROFILE_TOKEN=None)
+    def test_middleware_removes_itself_when_unconfigured(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: None)
+
+    @override_settings(ROOT_URLCONF=_async_read_urls())
+    async def test_async_requests(self):
+        async def get_response(request):
+            pass
+        # Stays async, so unsampled requests don't cost a thread hop
+        self.assertTrue(iscoroutinefunction(profiling.ProfilingMiddleware(get_response)))
+
+        client = AsyncClient()
+        response = await client.get('/posts', {'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(profiling.store.snapshot(), {})
+        response = await client.get('/posts', {'limit': 5}, headers={'x-profile': 'pr0file'})
+        self.assertEqual(response.status_code, 200)
+        [entry] = profiling.store.snapshot('posts')['posts']
+        self.assertEqual(entry['status'], 200)
+        self.assertTrue(entry['top'])
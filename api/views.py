@@ -1,52 +1,37 @@
-import jwt
 import json
-import os
-from openai import OpenAI
-from datetime import datetime, timezone, timedelta
-from django.conf import settings
+import uuid
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
-from .models import User, Profile, Experience, Education, Post, Comment
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-JWT_SECRET = settings.SECRET_KEY
-JWT_ALGORITHM = 'HS256'
-
-def create_token(user_id):
-    now = datetime.now(timezone.utc)
-    payload = {
-        'user_id': str(user_id),
-        'exp': now + timedelta(days=7),
-        'iat': now
-    }
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    return token
-
-
-def _get_user_from_token(request):
-    token = request.headers.get("x-auth-token")
-
-    if not token:
-        return None, Response({"error": "Token missing"}, status=401)
-    try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = decoded.get("user_id")
-        user = User.objects.get(id=user_id)
-        return user, None
-    except jwt.ExpiredSignatureError:
-        return None, Response({"error": "Token expired"}, status=401)
-    except jwt.InvalidTokenError:
-        return None, Response({"error": "Invalid token"}, status=401)
-    except User.DoesNotExist:
-        return None, Response({"error": "User not found"}, status=404)
-
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from .models import User, Profile, ProfileSkill, Skill, Experience, Education, Post, Comment, split_skills
+from .pagination import InvalidCursor, keyset_page, parse_limit
+from . import accounts
+from . import passwords
+from . import ratelimit
+from .ratelimit import rate_limit
+from .authentication import create_token
+from .permissions import IsAuthenticated, IsAuthenticatedOrDeleted, IsAuthenticatedOrReadOnly
+from . import cache as posts_cache
+from . import etags
+from . import metrics
+from . import renderers
+from . import search
+from . import serializers
+
+
+def _hashing_busy():
+    return Response({"error": "Too many login attempts, try again shortly"}, status=503, headers={"Retry-After": "1"})
 
 
 @api_view(['POST'])
+@rate_limit('register')
 def register(request):
     name = request.data.get('name')
     email = request.data.get('email')
@@ -56,7 +41,10 @@ def register(request):
         return Response({"error": "Email already exists"}, status=status.HTTP_400_BAD_REQUEST)
     
     user = User(name=name, email=email)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except passwords.HashingBusy:
+        return _hashing_busy()
     user.save()
 
     token = create_token(user.id)
@@ -76,6 +64,7 @@ def register(request):
 
 
 @api_view(['POST'])
+@rate_limit('login')
 def login(request):
     email = request.data.get('email')
     password = request.data.get('password')
@@ -85,7 +74,11 @@ def login(request):
     except User.DoesNotExist:
         return Response({"error": "User does not exists!"}, status=status.HTTP_400_BAD_REQUEST)
 
-    if not user.check_password(password):
+    try:
+        valid = user.check_password(password)
+    except passwords.HashingBusy:
+        return _hashing_busy()
+    if not valid:
         return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
 
     token = create_token(user.id)
@@ -105,251 +98,249 @@ def login(request):
 
 
 @api_view(['POST'])
+@permission_classes([IsAuthenticated])
 def create_profile(request):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
 
     data = request.data if isinstance(request.data, dict) else json.loads(request.body or '{}')
 
     # Create or update profile
-    profile, _ = Profile.objects.update_or_create(
-        user=user,
-        defaults={
-            "profession": data.get("status", ""),
-            "skills": data.get("skills", ""),
-            "company": data.get("company", ""),
-            "website": data.get("website", ""),
-            "location": data.get("location", ""),
-            "github_username": data.get("githubusername", ""),
-            "bio": data.get("bio", ""),
-            "twitter": data.get("twitter", ""),
-            "facebook": data.get("facebook", ""),
-            "linkedin": data.get("linkedin", ""),
-            "instagram": data.get("instagram", ""),
-            "youtube": data.get("youtube", ""),
-        },
-    )
+    with transaction.atomic():
+        profile, _ = Profile.objects.update_or_create(
+            user_id=user.id,
+            defaults={
+                "profession": data.get("status", ""),
+                "company": data.get("company", ""),
+                "website": data.get("website", ""),
+                "location": data.get("location", ""),
+                "github_username": data.get("githubusername", ""),
+                "bio": data.get("bio", ""),
+                "twitter": data.get("twitter", ""),
+                "facebook": data.get("facebook", ""),
+                "linkedin": data.get("linkedin", ""),
+                "instagram": data.get("instagram", ""),
+                "youtube": data.get("youtube", ""),
+            },
+        )
+        profile.set_skills(data.get("skills", ""))
 
     return Response({"message": "Profile created successfully!", "profile_id": str(profile.id)}, status=201)
 
 
+PROFILE_STREAM_CHUNK = 500
+
+
+def _profile_summaries(rows):
+    skills = serializers.skills_by_profile([p['id'] for p in rows])
+    return [serializers.profile_summary(p, skills[p['id']]) for p in rows]
+
+
+def _stream_profiles(rows):
+    # Emit the JSON array one chunk of rows at a time so memory stays flat
+    # however many profiles exist; skills are fetched once per chunk
+    def encode(batch):
+        return b','.join(renderers.dumps(doc) for doc in _profile_summaries(batch))
+
+    yield b'['
+    sep = b''
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= PROFILE_STREAM_CHUNK:
+            yield sep + encode(batch)
+            sep = b','
+            batch = []
+    if batch:
+        yield sep + encode(batch)
+    yield b']'
+
+
+async def _iterate_in_thread(chunks):
+    # Under ASGI, Django buffers a sync iterator whole before sending it.
+    # Pull one chunk at a time instead, all on the same thread, so the
+    # server-side cursor stays on the connection that opened it.
+    done = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
+
+
+def _streaming_response(request, chunks, **kwargs):
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _iterate_in_thread(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+def _filter_by_skills(profiles, names):
+    # Profiles having every requested skill: resolve the skill ids once, then one
+    # EXISTS per skill that the (skill, profile) unique index answers directly
+    slugs = {name.lower() for name in split_skills(names)}
+    if not slugs:
+        return profiles
+    skill_ids = list(Skill.objects.filter(slug__in=slugs).values_list('id', flat=True))
+    if len(skill_ids) < len(slugs):
+        return profiles.none()
+    for skill_id in skill_ids:
+        profiles = profiles.filter(
+            Exists(ProfileSkill.objects.filter(profile_id=OuterRef('pk'), skill_id=skill_id))
+        )
+    return profiles
+
+
 @api_view(['GET'])
 def list_profiles(request):
-    profiles = Profile.objects.select_related('user').all()
-    results = []
-    for p in profiles:
-        results.append({
-            "user": {
-                "_id": str(p.user.id),
-                "name": p.user.name,
-                # Placeholder avatar; frontend expects this key
-                "avatar": "",
-            },
-            "status": p.profession,
-            "company": p.company or "",
-            "location": p.location or "",
-            "skills": [s.strip() for s in (p.skills or '').split(',') if s.strip()],
-        })
-    return Response(results, status=200)
+    profiles = _filter_by_skills(
+        Profile.objects.values(*serializers.PROFILE_SUMMARY_FIELDS),
+        request.GET.getlist('skill'),
+    )
+
+    # ?limit=&cursor= returns one keyset page; otherwise the whole list is streamed
+    if 'limit' in request.GET or 'cursor' in request.GET:
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+            page, next_cursor = keyset_page(profiles, request.GET.get('cursor'), limit, field='created_at')
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=400)
+        return Response({"results": _profile_summaries(page), "next": next_cursor}, status=200)
+
+    rows = profiles.order_by('-created_at', '-id').iterator(chunk_size=PROFILE_STREAM_CHUNK)
+    return _streaming_response(request, _stream_profiles(rows), content_type='application/json', status=200)
+
+
+MAX_BATCH_PROFILES = 100
+
+
+@api_view(['GET'])
+def batch_profiles(request):
+    # ids may be repeated (?ids=a&ids=b) or comma-separated (?ids=a,b)
+    ids = []
+    for value in request.GET.getlist('ids'):
+        for raw in value.split(','):
+            if not raw.strip():
+                continue
+            try:
+                user_id = uuid.UUID(raw.strip())
+            except ValueError:
+                return Response({"error": f"Invalid id: {raw.strip()}"}, status=400)
+            if user_id not in ids:
+                ids.append(user_id)
+
+    if not ids:
+        return Response({"error": "ids is required"}, status=400)
+    if len(ids) > MAX_BATCH_PROFILES:
+        return Response({"error": f"At most {MAX_BATCH_PROFILES} ids per request"}, status=400)
+
+    full = request.GET.get('full') in ('1', 'true')
+    docs = serializers.load_profile_documents(ids, full=full)
+    return Response({
+        "results": [docs[user_id] for user_id in ids if user_id in docs],
+        "missing": [user_id for user_id in ids if user_id not in docs],
+    }, status=200)
 
 
 @api_view(['GET'])
 def get_profile_by_user(request, id):
-    try:
-        user = User.objects.get(id=id)
-        profile = Profile.objects.get(user=user)
-    except (User.DoesNotExist, Profile.DoesNotExist):
+    etag = etags.profile_etag(id)
+    if etag is None:
         return Response({"error": "Profile not found"}, status=404)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
 
-    exp = [{
-        "_id": str(e.id),
-        "company": e.company,
-        "from": e.from_date.strftime('%Y-%m-%d') if e.from_date else "",
-        "title": e.title,
-        "location": e.location or "",
-        "description": e.description or "",
-    } for e in profile.experiences.all().order_by('-from_date')]
-
-    edu = [{
-        "_id": str(ed.id),
-        "school": ed.school,
-        "fieldofstudy": ed.field_of_study,
-        "description": ed.description or "",
-        "degree": ed.degree,
-        "from": ed.from_date.strftime('%Y-%m-%d') if ed.from_date else "",
-    } for ed in profile.educations.all().order_by('-from_date')]
-
-    data = {
-        "user": {
-            "_id": str(user.id),
-            "name": user.name,
-            "avatar": "",
-        },
-        "status": profile.profession,
-        "company": profile.company or "",
-        "location": profile.location or "",
-        "bio": profile.bio or "",
-        "skills": [s.strip() for s in (profile.skills or '').split(',') if s.strip()],
-        "social": {
-            "facebook": profile.facebook or "",
-            "instagram": profile.instagram or "",
-            "linkedin": profile.linkedin or "",
-            "twitter": profile.twitter or "",
-            "youtube": profile.youtube or "",
-        },
-        "experience": exp,
-        "education": edu,
-    }
-    return Response(data, status=200)
+    data = serializers.load_profile_document(id)
+    if data is None:
+        return Response({"error": "Profile not found"}, status=404)
+    return Response(data, status=200, headers={"ETag": etag})
 
 
 @api_view(['GET'])
 def search_profile_by_username(request):
-    query = request.GET.get('q', '')
-    users = []
-
-    if query:
-        users = User.objects.filter(name__icontains=query)
+    try:
+        limit = parse_limit(request.GET.get('limit'), default=search.DEFAULT_LIMIT, maximum=search.MAX_LIMIT)
+    except InvalidCursor as e:
+        return Response({"error": str(e)}, status=400)
 
-    data = [{"id": i.id, "name": i.name} for i in users]
+    data = search.search_users(request.GET.get('q', ''), limit)
     return Response(data, status=200)
 
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def get_profile_me(request):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
-    try:
-        profile = Profile.objects.get(user=user)
-    except Profile.DoesNotExist:
+    user = request.user
+    etag = etags.profile_etag(user.id)
+    if etag is not None and etags.matches(request, etag):
+        return etags.not_modified(etag)
+    data = serializers.load_profile_document(user.id)
+    if data is None:
         return Response({
             "user": {"_id": str(user.id), "name": user.name, "avatar": ""},
         }, status=200)
-    # Reuse mapping from get_profile_by_user
-    exp = [{
-        "_id": str(e.id),
-        "company": e.company,
-        "from": e.from_date.strftime('%Y-%m-%d') if e.from_date else "",
-        "title": e.title,
-        "location": e.location or "",
-        "description": e.description or "",
-    } for e in profile.experiences.all().order_by('-from_date')]
-    edu = [{
-        "_id": str(ed.id),
-        "school": ed.school,
-        "fieldofstudy": ed.field_of_study,
-        "description": ed.description or "",
-        "degree": ed.degree,
-        "from": ed.from_date.strftime('%Y-%m-%d') if ed.from_date else "",
-    } for ed in profile.educations.all().order_by('-from_date')]
-    data = {
-        "user": {"_id": str(user.id), "name": user.name, "avatar": ""},
-        "status": profile.profession,
-        "company": profile.company or "",
-        "location": profile.location or "",
-        "bio": profile.bio or "",
-        "skills": [s.strip() for s in (profile.skills or '').split(',') if s.strip()],
-        "social": {
-            "facebook": profile.facebook or "",
-            "instagram": profile.instagram or "",
-            "linkedin": profile.linkedin or "",
-            "twitter": profile.twitter or "",
-            "youtube": profile.youtube or "",
-        },
-        "experience": exp,
-        "education": edu,
-    }
-    return Response(data, status=200)
+    return Response(data, status=200, headers={"ETag": etag})
 
 
 @api_view(['DELETE'])
 def delete_profile(request, id):
-    try:
-        # Get the user by ID from URL
-        user = User.objects.get(id=id)
-    except User.DoesNotExist:
+    # ?background=1 queues the deletion and answers 202 with a status URL
+    if request.GET.get('background') in ('1', 'true'):
+        # Only the caller may poll the job, so it needs to know who they are
+        IsAuthenticated().has_permission(request, None)
+        if not User.objects.filter(id=id).exists():
+            return Response({"error": "User not found"}, status=404)
+        job_id = accounts.queue_account_deletion(id, requested_by=request.user.id)
+        status_url = reverse('account_deletion_status', kwargs={"job_id": job_id})
+        return Response(
+            {"job_id": str(job_id), "status": "queued", "status_url": status_url},
+            status=202,
+            headers={"Location": status_url},
+        )
+
+    if not accounts.delete_account(id):
         return Response({"error": "User not found"}, status=404)
+    return Response({"msg": f"Account with id {id} deleted successfully"}, status=200)
 
-    try:
-        profile = Profile.objects.get(user=user)
-    except Profile.DoesNotExist:
-        profile = None
-
-    # Delete all user's posts (cascade deletes comments)
-    user_posts = Post.objects.filter(user=user)
-
-    # Delete all comments on user's posts manually (safe)
-    for post in user_posts:
-        Comment.objects.filter(post=post).delete()
-    user_posts.delete()
-
-    # Remove user from all post likes (many-to-many)
-    for post in Post.objects.all():
-        if post.likes.filter(id=user.id).exists():
-            post.likes.remove(user)
-
-    # Delete user's profile (cascade deletes experiences, educations, etc.)
-    if profile:
-        profile.delete()
-
-    # Finally delete the user
-    user.delete()
 
-    return Response({"msg": f"Account with id {id} deleted successfully"}, status=200)
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrDeleted])
+def account_deletion_status(request, job_id):
+    # The job may well have deleted the caller's own account by now
+    caller = request.user.id if request.user.is_authenticated else request.deleted_user_id
+    job = accounts.get_deletion_job(job_id, requested_by=caller)
+    if job is None:
+        return Response({"error": "Job not found"}, status=404)
+    return Response({"job_id": str(job_id), **job}, status=200)
 
 
 @api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
 def delete_experience(request, id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
-        profile = Profile.objects.get(user=user)
+        profile = Profile.objects.get(user_id=user.id)
         exp = Experience.objects.get(id=id, profile=profile)
     except (Profile.DoesNotExist, Experience.DoesNotExist):
         return Response({"error": "Experience not found"}, status=404)
     exp.delete()
-    experiences = [{
-        "_id": str(e.id),
-        "company": e.company,
-        "from": e.from_date.strftime('%Y-%m-%d') if e.from_date else "",
-        "title": e.title,
-        "location": e.location or "",
-        "description": e.description or "",
-    } for e in profile.experiences.all().order_by('-from_date')]
-    return Response({"experience": experiences}, status=200)
+    return Response({"experience": serializers.experiences(profile.id)}, status=200)
 
 
 @api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
 def delete_education(request, id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
-        profile = Profile.objects.get(user=user)
+        profile = Profile.objects.get(user_id=user.id)
         edu = Education.objects.get(id=id, profile=profile)
     except (Profile.DoesNotExist, Education.DoesNotExist):
         return Response({"error": "Education not found"}, status=404)
     edu.delete()
-    educations = [{
-        "_id": str(ed.id),
-        "school": ed.school,
-        "degree": ed.degree,
-        "fieldofstudy": ed.field_of_study,
-        "from": ed.from_date.strftime('%Y-%m-%d') if ed.from_date else "",
-        "description": ed.description or "",
-    } for ed in profile.educations.all().order_by('-from_date')]
-    return Response({"education": educations}, status=200)
+    return Response({"education": serializers.educations(profile.id)}, status=200)
 
 @api_view(['PUT'])
+@permission_classes([IsAuthenticated])
 def add_experience(request):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
-        profile = Profile.objects.get(user=user)
+        profile = Profile.objects.get(user_id=user.id)
     except Profile.DoesNotExist:
         return Response({"error": "Profile not found"}, status=404)
     data = request.data
@@ -361,25 +352,15 @@ def add_experience(request):
         from_date=data.get('from'),
         description=data.get('description', ''),
     )
-    # Return all experiences after adding new one
-    experiences = [{
-        "_id": str(e.id),
-        "company": e.company,
-        "from": e.from_date.strftime('%Y-%m-%d') if e.from_date else "",
-        "title": e.title,
-        "location": e.location or "",
-        "description": e.description or "",
-    } for e in profile.experiences.all().order_by('-from_date')]
-    return Response({"experience": experiences}, status=200)
+    return Response({"experience": serializers.experiences(profile.id)}, status=200)
 
 
 @api_view(['PUT'])
+@permission_classes([IsAuthenticated])
 def add_education(request):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
-        profile = Profile.objects.get(user=user)
+        profile = Profile.objects.get(user_id=user.id)
     except Profile.DoesNotExist:
         return Response({"error": "Profile not found"}, status=404)
     data = request.data
@@ -391,130 +372,170 @@ def add_education(request):
         from_date=data.get('from'),
         description=data.get('description', ''),
     )
-    # Return all educations after adding new one
-    educations = [{
-        "_id": str(ed.id),
-        "school": ed.school,
-        "degree": ed.degree,
-        "fieldofstudy": ed.field_of_study,
-        "from": ed.from_date.strftime('%Y-%m-%d') if ed.from_date else "",
-        "description": ed.description or "",
-    } for ed in profile.educations.all().order_by('-from_date')]
-    return Response({"education": educations}, status=200)
+    return Response({"education": serializers.educations(profile.id)}, status=200)
 
 
 @api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticatedOrReadOnly])
 def posts(request):
     if request.method == 'GET':
-        all_posts = Post.objects.all().order_by('-date')
-        results = []
-        for p in all_posts:
-            results.append({
-                "_id": str(p.id),
-                "user": str(p.user.id),
-                "name": p.name,
-                "avatar": "",
-                "text": p.text,
-                "date": p.date.strftime('%Y-%m-%d'),
-                "likes": [str(u.id) for u in p.likes.all()],
-                "comments": p.comments.count(),
-            })
-        return Response(results, status=200)
+        cursor = request.GET.get('cursor')
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+            data = posts_cache.feed_page(cursor, limit, lambda: _build_feed_page(cursor, limit))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(data, status=200)
 
     # POST create
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     data = request.data
-    post = Post.objects.create(user=user, name=user.name, text=data.get('text', ''))
+    post = Post.objects.create(user_id=user.id, name=user.name, text=data.get('text', ''))
+    posts_cache.invalidate_posts()
     return Response({
         "_id": str(post.id),
-        "user": str(post.user.id),
+        "user": str(post.user_id),
         "name": post.name,
         "avatar": "",
         "text": post.text,
         "date": post.date.strftime('%Y-%m-%d'),
         "likes": [],
+        "likes_count": 0,
         "comments": 0,
     }, status=201)
 
 
+def _feed_document(page, next_cursor):
+    # Counts come from the counter columns; who liked a post is only read
+    # for the post detail and like/unlike responses
+    results = [{
+        "_id": str(p.id),
+        "user": str(p.user_id),
+        "name": p.name,
+        "avatar": "",
+        "text": p.text,
+        "date": p.date.strftime('%Y-%m-%d'),
+        "likes_count": p.likes_count,
+        "comments": p.comments_count,
+    } for p in page]
+    return {"results": results, "next": next_cursor}
+
+
+def _build_feed_page(cursor, limit):
+    page, next_cursor = keyset_page(Post.objects.all(), cursor, limit)
+    return _feed_document(page, next_cursor)
+
+
 @api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticatedOrReadOnly])
 def post_detail(request, id):
+    if request.method == 'GET':
+        cached = posts_cache.post_document(id, lambda: _build_post_document(id))
+        if cached is None:
+            return Response({"error": "Post not found"}, status=404)
+        if etags.matches(request, cached["etag"]):
+            return etags.not_modified(cached["etag"])
+        return Response(cached["document"], status=200, headers={"ETag": cached["etag"]})
+
     try:
         post = Post.objects.get(id=id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=404)
 
-    if request.method == 'DELETE':
-        user, error = _get_user_from_token(request)
-        if error:
-            return error
-        if post.user != user:
-            return Response({"error": "Not authorized"}, status=403)
-        post.delete()
-        return Response({"msg": "Post deleted"}, status=200)
+    user = request.user
+    if post.user_id != user.id:
+        return Response({"error": "Not authorized"}, status=403)
+    post.delete()
+    posts_cache.invalidate_posts([id])
+    return Response({"msg": "Post deleted"}, status=200)
 
-    # GET
-    return Response({
+
+def _post_document(post, like_ids, comments):
+    return {
         "_id": str(post.id),
-        "user": str(post.user.id),
+        "user": str(post.user_id),
         "name": post.name,
         "avatar": "",
         "text": post.text,
         "date": post.date.strftime('%Y-%m-%d'),
-        "likes": [str(u.id) for u in post.likes.all()],
+        "likes": [str(pk) for pk in like_ids],
+        "likes_count": post.likes_count,
         "comments": [{
             "_id": str(c.id),
-            "user": str(c.user.id),
+            "user": str(c.user_id),
             "name": c.name,
             "avatar": "",
             "text": c.text,
             "date": c.date.strftime('%Y-%m-%d'),
-        } for c in post.comments.all().order_by('-date')],
-    }, status=200)
+        } for c in comments],
+    }
+
+
+def _build_post_document(id):
+    try:
+        post = Post.objects.get(id=id)
+    except Post.DoesNotExist:
+        return None
+    return {
+        "etag": etags.post_etag(post),
+        "document": _post_document(post, post.likes.values_list('id', flat=True), post.comments.all().order_by('-date')),
+    }
 
 
 @api_view(['PUT'])
+@permission_classes([IsAuthenticated])
 def like_post(request, id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
         post = Post.objects.get(id=id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=404)
-    post.likes.add(user)
-    return Response([str(u.id) for u in post.likes.all()], status=200)
+    with transaction.atomic():
+        _, created = Post.likes.through.objects.get_or_create(post_id=post.id, user_id=user.id)
+        if created:
+            Post.objects.filter(id=post.id).update(likes_count=F('likes_count') + 1, updated_at=timezone.now())
+            posts_cache.invalidate_posts([post.id])
+    return _likers(post.id)
 
 
 @api_view(['PUT'])
+@permission_classes([IsAuthenticated])
 def unlike_post(request, id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
         post = Post.objects.get(id=id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=404)
-    post.likes.remove(user)
-    return Response([str(u.id) for u in post.likes.all()], status=200)
+    with transaction.atomic():
+        removed, _ = Post.likes.through.objects.filter(post_id=post.id, user_id=user.id).delete()
+        if removed:
+            Post.objects.filter(id=post.id).update(likes_count=F('likes_count') - 1, updated_at=timezone.now())
+            posts_cache.invalidate_posts([post.id])
+    return _likers(post.id)
+
+
+def _likers(post_id):
+    # The response like/unlike have always had: the ids of everyone who likes the post
+    user_ids = Post.likes.through.objects.filter(post_id=post_id).values_list('user_id', flat=True)
+    return Response([str(pk) for pk in user_ids], status=200)
 
 
 @api_view(['POST'])
+@permission_classes([IsAuthenticated])
 def add_comment(request, id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
         post = Post.objects.get(id=id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=404)
     data = request.data
-    c = Comment.objects.create(post=post, user=user, name=user.name, text=data.get('text', ''))
+    with transaction.atomic():
+        c = Comment.objects.create(post=post, user_id=user.id, name=user.name, text=data.get('text', ''))
+        Post.objects.filter(id=post.id).update(comments_count=F('comments_count') + 1, updated_at=timezone.now())
+        posts_cache.invalidate_posts([post.id])
     return Response({
         "_id": str(c.id),
-        "user": str(c.user.id),
+        "user": str(c.user_id),
         "name": c.name,
         "avatar": "",
         "text": c.text,
@@ -522,46 +543,46 @@ def add_comment(request, id):
     }, status=201)
 
 
+@api_view(['GET'])
+def rate_limit_stats(request):
+    if not metrics.authorized(request):
+        return Response(status=401)
+    return Response(ratelimit.stats.snapshot(), status=200)
+
+
+@api_view(['GET'])
+def cache_stats(request):
+    # Same counters as /metrics, behind the same token
+    if not metrics.authorized(request):
+        return Response(status=401)
+    return Response(posts_cache.stats.snapshot(), status=200)
+
+
 # delete_post merged into post_detail
 
 @api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
 def delete_comment(request, post_id, comment_id):
-    user, error = _get_user_from_token(request)
-    if error:
-        return error
+    user = request.user
     try:
         post = Post.objects.get(id=post_id)
         comment = Comment.objects.get(id=comment_id, post=post)
     except (Post.DoesNotExist, Comment.DoesNotExist):
         return Response({"error": "Comment not found"}, status=404)
-    if comment.user != user:
+    if comment.user_id != user.id:
         return Response({"error": "Not authorized"}, status=403)
-    comment.delete()
+    with transaction.atomic():
+        removed, _ = comment.delete()
+        if removed:
+            Post.objects.filter(id=post.id).update(comments_count=F('comments_count') - removed, updated_at=timezone.now())
+            posts_cache.invalidate_posts([post.id])
     # return remaining comments list (optional)
     comments = [{
         "_id": str(c.id),
-        "user": str(c.user.id),
+        "user": str(c.user_id),
         "name": c.name,
         "avatar": "",
         "text": c.text,
         "date": c.date.strftime('%Y-%m-%d'),
     } for c in post.comments.all().order_by('-date')]
     return Response({"msg": "Comment deleted", "comments": comments}, status=200)
-
-
-
-
-@api_view(['POST'])
-def openai(request):
-    data = json.loads(request.body)
-    message = data.get("message")
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": message},
-        ]
-    )
-
-    return Response({"response": response.choices[0].message.content}, status=200)
\ No newline at end of file
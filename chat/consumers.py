@@ -1,9 +1,67 @@
 import json
+import math
+import uuid
 import jwt
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Subquery
+from django.utils import timezone
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from api.pagination import InvalidCursor, encode_cursor, keyset_page, keyset_window, parse_limit
+
+
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
+
+
+def _message_doc(msg):
+    return {
+        "id": str(msg.id),
+        "chat_id": str(msg.chat_id),
+        "sender_id": str(msg.sender_id),
+        "text": msg.text,
+        "time": str(msg.time),
+    }
+
+
+def _create_private_chat(key, sender_id, receiver_id, text, now):
+    """
+    Create the pair's private chat, starting with ``text`` as its last
+    message. Returns ``(chat_id, created)``; when a concurrent call created
+    it first, the unique pair_key makes this insert fail and that chat is
+    used instead. Call inside a transaction.
+    """
+    from api.models import Chat, ChatMember
+
+    try:
+        with transaction.atomic():
+            chat = Chat.objects.create(type="private", pair_key=key, last_message_text=text,
+                                       last_message_sender_id=sender_id, last_message_time=now)
+            ChatMember.objects.bulk_create(
+                ChatMember(chat=chat, user_id=uid) for uid in dict.fromkeys([sender_id, uuid.UUID(str(receiver_id))])
+            )
+        return chat.id, True
+    except IntegrityError:
+        chat_id = Chat.objects.filter(pair_key=key).values_list('id', flat=True).first()
+        if chat_id is None:
+            raise
+        return chat_id, False
+
+
+def _record_last_message(msg):
+    from api.models import Chat
+
+    # Keep Chat's last-message columns in step; never move a chat back in
+    # time if a newer message was recorded first
+    Chat.objects.filter(id=msg.chat_id, last_message_time__lte=msg.time).update(
+        last_message_text=msg.text,
+        last_message_sender_id=msg.sender_id,
+        last_message_time=msg.time,
+    )
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
 
 
@@ -82,49 +140,60 @@ class ChatConsumer(AsyncWebsocketConsumer):
     # Receive
 
 
+    ACTIONS = ("new_chat", "get_user_chats", "get_messages", "send_message", "get_all_users")
+
     async def receive(self, text_data):
-        from api.models import User, Chat, Messages
+        from api import metrics, ratelimit
 
         data   = json.loads(text_data)
         action = data.get("action")
         message = data.get("message")
 
+        # Unknown actions share one bucket and one metrics series
+        name = action if action in self.ACTIONS else "unknown"
 
+        # Per-user bucket for each action; a flood is answered without touching the DB
+        allowed, retry_after = await ratelimit.acheck(f"ws:{name}", f"user:{self.user.id}")
+        if not allowed:
+            await self.send(text_data=json.dumps({
+                "action": "rate_limited",
+                "for": action,
+                "retry_after": max(1, math.ceil(retry_after)),
+            }))
+            return
+
+        with metrics.observe_ws(name):
+            await self.handle_action(action, message)
+
+    async def handle_action(self, action, message):
         #
         #    Handle new chat message
         #
 
         if action == "new_chat":
             receiver_id     = message["receiver_id"]
-            sender_id       = message["sender_id"]
+            sender_id       = str(self.user.id)   # never trust the client's sender_id
             text            = message["text"]  
 
             receiver_group_name = f"user_{receiver_id}"
 
-            # create chat and message in DB
-            chat = Chat(type="private", users_id=[receiver_id, sender_id])
-            await database_sync_to_async(chat.save)()
-
-            message_db = Messages(chat_id=chat.id, sender_id=sender_id, text=text)
-            await database_sync_to_async(message_db.save)()
-
-
-            # Fetch message again to access created_at
-            saved_message = await database_sync_to_async(
-                lambda: Messages.objects.get(id=message_db.id)
-            )()
-
-            # Add time to message object
-            message["time"] = str(saved_message.time)
-
-
-            user = await self.get_user(receiver_id)
+            # the pair's private chat (created if new) and the message, in one DB hop
+            started = await self.start_chat(receiver_id, text)
+            if started is None:
+                await self.send(text_data=json.dumps({
+                    "action": "error",
+                    "for": action,
+                    "error": "User not found",
+                }))
+                return
+            chat_id, receiver_name, message_db = started
+            message = {**message, **message_db}
 
              # -------  SEND NEW CHAT CREATED -------
             chat_obj = {
-                "chat_id": str(chat.id),
+                "chat_id": str(chat_id),
                 "user_id": str(receiver_id),      # or the user's id you're chatting with
-                "name": user.name,                  # you can put username here
+                "name": receiver_name,              # you can put username here
                 "last_message": text,
                 "last_message_time": message["time"]
             }
@@ -163,50 +232,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
 
         if action == "get_user_chats":
-            user_id = message["user_id"]
-
-            chats_from_db = await database_sync_to_async(list)(
-                Chat.objects.filter(users_id__contains=[user_id])
-            )
-
-            # Map of { "other_user_id": chat_id }
-            map_user_to_chat = {}
-
-            for chat in chats_from_db:
-                for uid in chat.users_id:
-                    if str(uid) != str(user_id):
-                        map_user_to_chat[str(uid)] = str(chat.id)
-
-            other_user_ids = list(map_user_to_chat.keys())
-
-            # Get user objects
-            users_from_db = await database_sync_to_async(list)(
-                User.objects.filter(id__in=other_user_ids)
-            )
-
-            chats = []
-            for user in users_from_db:
-                uid = str(user.id)
-                chat_id = map_user_to_chat[uid]
-
-                # --- get last message ---
-                last_msg = await database_sync_to_async(
-                    lambda: Messages.objects.filter(chat_id=chat_id)
-                    .order_by("-time")
-                    .first()
-                )()
-
-                chats.append({
-                    "user_id": uid,
-                    "name": user.name,
-                    "chat_id": chat_id,
-                    "last_message": last_msg.text if last_msg else None,
-                    "last_message_time": last_msg.time.isoformat() if last_msg else None,
-                })
+            message = message or {}
+            try:
+                chats, next_cursor = await self.get_user_chats(message.get("cursor"), message.get("limit"))
+            except InvalidCursor as exc:
+                await self.send(text_data=json.dumps({
+                    "action": "error",
+                    "for": action,
+                    "error": str(exc),
+                }))
+                return
 
             await self.send(text_data=json.dumps({
                 "action": "user_chats",
                 "chats": chats,
+                "next": next_cursor,
             }))
 
 
@@ -218,11 +258,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if action == 'get_messages':
             chat_id = message["chat_id"]
 
-            messages = await self.get_messages(chat_id)
+            try:
+                page = await self.get_messages(chat_id, message.get("before"), message.get("after"), message.get("limit"))
+                error = None if page is not None else "Not a member of this chat"
+            except InvalidCursor as exc:
+                error = str(exc)
+            if error:
+                await self.send(text_data=json.dumps({
+                    "action": "error",
+                    "for": action,
+                    "error": error,
+                }))
+                return
 
             await self.send(text_data=json.dumps({
                 "action": "chat_messages",
-                "messages": messages,
+                "chat_id": str(chat_id),
+                **page,
             }))
         
 
@@ -231,22 +283,30 @@ class ChatConsumer(AsyncWebsocketConsumer):
         #
     
         if action == 'send_message':
-            receiver_id     = message["receiver_id"]
-            sender_id       = message["sender_id"]
+            sender_id       = str(self.user.id)
             text            = message["text"]  
             chat_id         = message["chat_id"]  
 
-            receiver_group_name = f"user_{receiver_id}"
-            message_db = await self.create_message(chat_id, sender_id, text)
+            # Receivers are the chat's other members, not whoever the client names
+            created = await self.create_message(chat_id, text)
+            if created is None:
+                await self.send(text_data=json.dumps({
+                    "action": "error",
+                    "for": action,
+                    "error": "Not a member of this chat",
+                }))
+                return
+            message_db, receiver_ids = created
 
-            await self.channel_layer.group_send(
-                receiver_group_name,
-                {
-                    "type": "chat_message",
-                    "message": message_db,
-                    "sender_id": sender_id,
-                }
-            )
+            for receiver_id in receiver_ids:
+                await self.channel_layer.group_send(
+                    f"user_{receiver_id}",
+                    {
+                        "type": "chat_message",
+                        "message": message_db,
+                        "sender_id": sender_id,
+                    }
+                )
 
             await self.send(text_data=json.dumps({
                 "type": "chat_message",
@@ -298,32 +358,118 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return None
         
     @database_sync_to_async
-    def get_messages(self, chat_id):
-        from api.models import Messages
-
-        messages = list(Messages.objects.filter(chat_id=chat_id).values())
+    def get_user_chats(self, cursor, limit):
+        from api.models import Chat, ChatMember
+
+        # The caller's chats, most recent first, from the denormalized
+        # last-message columns: two queries however many chats there are
+        chats, next_cursor = keyset_page(
+            Chat.objects.filter(memberships__user_id=self.user.id),
+            cursor, parse_limit(limit), field='last_message_time',
+        )
+
+        peers = {}
+        if chats:
+            others = (
+                ChatMember.objects.filter(chat_id__in=[chat.id for chat in chats])
+                .exclude(user_id=self.user.id)
+                .order_by('id').values_list('chat_id', 'user_id', 'user__name')
+            )
+            for chat_id, user_id, name in others:
+                peers.setdefault(chat_id, (str(user_id), name))
+
+        result = []
+        for chat in chats:
+            user_id, name = peers.get(chat.id, (None, None))
+            result.append({
+                "user_id": user_id,
+                "name": name,
+                "chat_id": str(chat.id),
+                "last_message": chat.last_message_text,
+                "last_message_time": chat.last_message_time.isoformat() if chat.last_message_sender_id else None,
+            })
+        return result, next_cursor
 
-        # Convert UUIDs to strings
-        for msg in messages:
-            msg["id"] = str(msg["id"])
-            msg["chat_id"] = str(msg["chat_id"])
-            msg["sender_id"] = str(msg["sender_id"])
-            msg["text"] = str(msg["text"])
-            msg["time"] = str(msg["time"])
+    @database_sync_to_async
+    def start_chat(self, receiver_id, text):
+        """
+        new_chat's unit of work, in one transaction on one thread hop: the
+        pair's private chat and the message. Returns ``(chat_id, receiver
+        name, message)``, or ``None`` if the receiver does not exist.
+        """
+        from api.models import Chat, Messages, User
+
+        key = Chat.pair_key_for(self.user.id, receiver_id)
+        now = timezone.now()
+        with transaction.atomic():
+            # The receiver's name and the pair's existing chat in one query
+            row = (
+                User.objects.filter(id=receiver_id)
+                .annotate(chat_id=Subquery(Chat.objects.filter(pair_key=key).values('id')[:1]))
+                .values_list('name', 'chat_id').first()
+            )
+            if row is None:
+                return None
+            name, chat_id = row
+            created = False
+            if chat_id is None:
+                chat_id, created = _create_private_chat(key, self.user.id, receiver_id, text, now)
+            msg = Messages.objects.create(chat_id=chat_id, sender_id=self.user.id, text=text, time=now)
+            if not created:
+                _record_last_message(msg)
+        return chat_id, name, _message_doc(msg)
 
-        return messages
-    
     @database_sync_to_async
-    def create_message(self, chat_id, sender_id, text):
-        from api.models import Messages
-        msg = Messages.objects.create(chat_id=chat_id, sender_id=sender_id, text=text)
+    def get_messages(self, chat_id, before, after, limit):
+        """
+        One page of a chat's history, newest first, or ``None`` if the
+        connected user is not a member. ``before``/``after`` in the result
+        are the cursors for loading older messages and catching up on newer
+        ones; ``has_more`` is whether the direction read has more.
+        """
+        from api.models import ChatMember, Messages
+
+        if not ChatMember.objects.filter(user_id=self.user.id, chat_id=chat_id).exists():
+            return None
+
+        rows, has_more = keyset_window(
+            Messages.objects.filter(chat_id=chat_id).values_list('id', 'sender_id', 'text', 'time'),
+            parse_limit(limit, MESSAGES_PAGE_SIZE, MESSAGES_MAX_PAGE_SIZE),
+            before=before, after=after, field='time',
+        )
+        chat_id = str(chat_id)
+        messages = [{
+            "id": str(pk),
+            "chat_id": chat_id,
+            "sender_id": str(sender_id),
+            "text": text,
+            "time": str(time),
+        } for pk, sender_id, text, time in rows]
+
         return {
-            "id": str(msg.id),
-            "chat_id": str(msg.chat_id),
-            "sender_id": str(msg.sender_id),
-            "text": msg.text,
-            "time": str(msg.time),
+            "messages": messages,
+            "has_more": has_more,
+            # An empty page keeps the caller's cursor so polling can continue
+            "before": encode_cursor(rows[-1][3], rows[-1][0]) if rows else before,
+            "after": encode_cursor(rows[0][3], rows[0][0]) if rows else after,
         }
+    
+    @database_sync_to_async
+    def create_message(self, chat_id, text):
+        """
+        Store a message from the connected user. Returns ``(message, other
+        member ids)``, or ``None`` if the user is not a member of the chat.
+        """
+        from api.models import ChatMember, Messages
+
+        members = list(ChatMember.objects.filter(chat_id=chat_id).values_list('user_id', flat=True))
+        if self.user.id not in members:
+            return None
+        with transaction.atomic():
+            msg = Messages.objects.create(chat_id=chat_id, sender_id=self.user.id, text=text)
+            _record_last_message(msg)
+        receivers = [str(uid) for uid in members if uid != self.user.id]
+        return _message_doc(msg), receivers
 
     @database_sync_to_async
     def get_all_users(self):
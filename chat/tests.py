@@ -1,3 +1,193 @@
-from django.test import TestCase
+import asyncio
+import json
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from api.authentication import create_token
+from api.models import Chat, ChatMember, Messages
+from api.testing import QueryBudgetMixin, seed_network, write_report
+from DevConnector_back.asgi import application
+
+
+def tearDownModule():
+    write_report()
+
+
+# TransactionTestCase: the consumer closes stale connections around each
+# database_sync_to_async call, which would abort a TestCase transaction
+@override_settings(RATE_LIMITS={}, PASSWORD_PBKDF2_ITERATIONS=1000)
+class ChatConsumerTests(QueryBudgetMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = seed_network(users=4, posts=0)
+        self.me, self.other = self.users[0], self.users[1]
+        self.chats = []
+        for peer in self.users[1:]:
+            chat = Chat.objects.create(type="private", pair_key=Chat.pair_key_for(peer.id, self.me.id))
+            ChatMember.objects.bulk_create([ChatMember(chat=chat, user=peer), ChatMember(chat=chat, user=self.me)])
+            Messages.objects.bulk_create([
+                Messages(chat=chat, sender_id=sender.id, text=f"Message {n}")
+                for n, sender in enumerate([self.me, peer] * 5)
+            ])
+            last = Messages.objects.filter(chat=chat).order_by('-time', '-id').first()
+            Chat.objects.filter(id=chat.id).update(last_message_text=last.text, last_message_sender_id=last.sender_id,
+                                                   last_message_time=last.time)
+            self.chats.append(chat)
+
+    async def connect(self, user=None):
+        token = create_token((user or self.me).id)
+        communicator = WebsocketCommunicator(application, "/ws/chat/", headers=[(b"cookie", f"token={token}".encode())])
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        hello = await communicator.receive_json_from()
+        self.assertEqual(hello["user"]["id"], str((user or self.me).id))
+        return communicator
+
+    async def send(self, communicator, action, message=None):
+        await communicator.send_to(text_data=json.dumps({"action": action, "message": message}))
+        return await communicator.receive_json_from()
+
+    async def test_connect(self):
+        async with self.aquery_budget("ws connect", 1):
+            communicator = await self.connect()
+        await communicator.disconnect()
+
+    async def test_connect_without_token(self):
+        communicator = WebsocketCommunicator(application, "/ws/chat/")
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def new_chat(self, communicator, receiver, text):
+        message = {"receiver_id": str(receiver.id), "text": text}
+        await communicator.send_to(text_data=json.dumps({"action": "new_chat", "message": message}))
+        events = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual({e["type"] for e in events}, {"new_chat_created", "chat_message"})
+        return next(e["chat"] for e in events if e["type"] == "new_chat_created")
+
+    async def test_new_chat(self):
+        sender, receiver = self.users[1], self.users[2]
+        communicator = await self.connect(sender)
+        async with self.aquery_budget("ws new_chat", 8):
+            created = await self.new_chat(communicator, receiver, "hi")
+        chat = await Chat.objects.aget(id=created["chat_id"])
+        self.assertEqual((chat.pair_key, chat.last_message_text), (Chat.pair_key_for(sender.id, receiver.id), "hi"))
+        self.assertEqual(await ChatMember.objects.filter(chat=chat).acount(), 2)
+        await communicator.disconnect()
+
+    async def test_new_chat_reuses_the_pair_chat(self):
+        communicator = await self.connect()
+        async with self.aquery_budget("ws new_chat (existing pair)", 5):
+            created = await self.new_chat(communicator, self.other, "again")
+        self.assertEqual(created["chat_id"], str(self.chats[0].id))
+        self.assertEqual(await Chat.objects.acount(), len(self.chats))
+        await communicator.disconnect()
+
+    async def test_new_chat_with_unknown_receiver(self):
+        communicator = await self.connect()
+        response = await self.send(communicator, "new_chat",
+                                   {"receiver_id": "00000000-0000-0000-0000-000000000000", "text": "anyone?"})
+        self.assertEqual(response["error"], "User not found")
+        self.assertFalse(await Messages.objects.filter(text="anyone?").aexists())
+        self.assertEqual(await Chat.objects.acount(), len(self.chats))
+        await communicator.disconnect()
+
+    async def test_concurrent_new_chat_creates_one_chat(self):
+        a, b = self.users[1], self.users[2]
+        first, second = await self.connect(a), await self.connect(b)
+        await asyncio.gather(
+            first.send_to(text_data=json.dumps({"action": "new_chat", "message": {"receiver_id": str(b.id), "text": "hi b"}})),
+            second.send_to(text_data=json.dumps({"action": "new_chat", "message": {"receiver_id": str(a.id), "text": "hi a"}})),
+        )
+        # Each side sees its own two events and the other side's two
+        events = [await c.receive_json_from() for c in (first, second) for _ in range(4)]
+        chat_ids = {e["chat"]["chat_id"] for e in events if e["type"] == "new_chat_created"}
+        self.assertEqual(len(chat_ids), 1)
+        self.assertEqual(await Chat.objects.filter(pair_key=Chat.pair_key_for(a.id, b.id)).acount(), 1)
+        self.assertEqual(await Messages.objects.filter(chat_id=chat_ids.pop()).acount(), 2)
+        await first.disconnect()
+        await second.disconnect()
+
+    async def test_get_user_chats(self):
+        communicator = await self.connect()
+        # Constant however many chats: the last message lives on Chat
+        async with self.aquery_budget("ws get_user_chats", 2):
+            response = await self.send(communicator, "get_user_chats", {"limit": 2})
+        self.assertEqual([c["chat_id"] for c in response["chats"]], [str(c.id) for c in self.chats[::-1][:2]])
+        self.assertEqual(response["chats"][0]["last_message"], "Message 9")
+        self.assertEqual(response["chats"][0]["user_id"], str(self.users[3].id))
+        response = await self.send(communicator, "get_user_chats", {"limit": 2, "cursor": response["next"]})
+        self.assertEqual([c["chat_id"] for c in response["chats"]], [str(self.chats[0].id)])
+        self.assertIsNone(response["next"])
+        await communicator.disconnect()
+
+    async def test_get_messages(self):
+        chat_id = str(self.chats[0].id)
+        history = [str(pk) async for pk in Messages.objects.filter(chat_id=chat_id)
+                   .order_by('-time', '-id').values_list('id', flat=True)]
+        communicator = await self.connect()
+        # Membership check and one page
+        async with self.aquery_budget("ws get_messages", 2):
+            page = await self.send(communicator, "get_messages", {"chat_id": chat_id, "limit": 4})
+        self.assertEqual([m["id"] for m in page["messages"]], history[:4])
+        self.assertTrue(page["has_more"])
+
+        older = await self.send(communicator, "get_messages", {"chat_id": chat_id, "limit": 4, "before": page["before"]})
+        self.assertEqual([m["id"] for m in older["messages"]], history[4:8])
+        oldest = await self.send(communicator, "get_messages", {"chat_id": chat_id, "limit": 4, "before": older["before"]})
+        self.assertEqual([m["id"] for m in oldest["messages"]], history[8:])
+        self.assertFalse(oldest["has_more"])
+
+        newer = await self.send(communicator, "get_messages", {"chat_id": chat_id, "limit": 2, "after": older["after"]})
+        self.assertEqual([m["id"] for m in newer["messages"]], history[2:4])
+        self.assertTrue(newer["has_more"])
+        newest = await self.send(communicator, "get_messages", {"chat_id": chat_id, "after": page["after"]})
+        self.assertEqual((newest["messages"], newest["has_more"], newest["after"]), ([], False, page["after"]))
+        await communicator.disconnect()
+
+    async def test_get_messages_rejects_non_members_and_bad_cursors(self):
+        communicator = await self.connect(self.users[2])
+        response = await self.send(communicator, "get_messages", {"chat_id": str(self.chats[0].id)})
+        self.assertEqual(response["error"], "Not a member of this chat")
+        response = await self.send(communicator, "get_messages", {"chat_id": str(self.chats[1].id), "before": "junk"})
+        self.assertEqual(response["error"], "Invalid cursor")
+        await communicator.disconnect()
+
+    async def test_send_message(self):
+        communicator = await self.connect()
+        message = {"receiver_id": str(self.other.id), "sender_id": str(self.me.id), "text": "hello",
+                   "chat_id": str(self.chats[0].id)}
+        # Membership check, then insert and last-message update in one
+        # transaction (BEGIN/COMMIT count on SQLite)
+        async with self.aquery_budget("ws send_message", 5):
+            response = await self.send(communicator, "send_message", message)
+        self.assertEqual(response["message"]["text"], "hello")
+        chat = await Chat.objects.aget(id=self.chats[0].id)
+        self.assertEqual((chat.last_message_text, chat.last_message_sender_id), ("hello", self.me.id))
+        await communicator.disconnect()
+
+    async def test_send_message_outside_chat(self):
+        communicator = await self.connect(self.users[2])
+        message = {"text": "intruding", "chat_id": str(self.chats[0].id)}
+        async with self.aquery_budget("ws send_message (not a member)", 1):
+            response = await self.send(communicator, "send_message", message)
+        self.assertEqual(response["error"], "Not a member of this chat")
+        self.assertFalse(await Messages.objects.filter(text="intruding").aexists())
+        await communicator.disconnect()
+
+    async def test_get_all_users(self):
+        communicator = await self.connect()
+        async with self.aquery_budget("ws get_all_users", 1):
+            response = await self.send(communicator, "get_all_users")
+        self.assertEqual(len(response["users"]), len(self.users))
+        await communicator.disconnect()
+
+    async def test_rate_limited_action_skips_database(self):
+        communicator = await self.connect()
+        with override_settings(RATE_LIMITS={"ws": "1/min"}):
+            await self.send(communicator, "get_all_users")
+            async with self.aquery_budget("ws rate limited", 0):
+                response = await self.send(communicator, "get_all_users")
+        self.assertEqual(response["action"], "rate_limited")
+        await communicator.disconnect()